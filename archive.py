@@ -0,0 +1,248 @@
+import datetime
+import json
+import mmap
+import os
+import struct
+import threading
+from collections.abc import Iterator
+from typing import BinaryIO
+import acrostic
+import crossword
+import cwb
+import nyt_json
+
+FILE_HEADER = b"CWARCH\x00\x01"
+ENTRY_MAGIC = b"CWAE"
+INDEX_MAGIC = b"CWAI"
+TRAILER_MAGIC = b"CWAT"
+ENTRY_HEADER = struct.Struct("<4sIQ")
+TRAILER = struct.Struct("<Q4s")
+
+PUZZLE_PART = "puzzle.cwb"
+PDF_PART = "puzzle.pdf"
+ANSWER_PDF_PART = "answer.pdf"
+
+ArchiveKey = tuple[str, str, str, str]
+
+def expected_parts(puzzle: nyt_json.PuzzleResult) -> list[str]:
+	match puzzle["format_type"]:
+		case "Normal" | "Acrostic":
+			return [PUZZLE_PART]
+		case "PDF":
+			return [PDF_PART, ANSWER_PDF_PART]
+		case _:
+			return []
+
+def archive_key(puzzle: nyt_json.PuzzleResult) -> ArchiveKey:
+	return (
+		puzzle["print_date"],
+		puzzle["publish_type"],
+		puzzle["format_type"],
+		puzzle["title"]
+	)
+
+class ArchiveEntry(object):
+	def __init__(self, puzzle: nyt_json.PuzzleResult):
+		self.__puzzle = puzzle
+		self.__parts: dict[str, tuple[int, int]] = {}
+
+	@property
+	def puzzle(self):
+		return self.__puzzle
+
+	@property
+	def key(self) -> ArchiveKey:
+		return archive_key(self.__puzzle)
+
+	@property
+	def date(self) -> datetime.date:
+		return datetime.date.fromisoformat(self.__puzzle["print_date"])
+
+	@property
+	def parts(self):
+		return self.__parts
+
+	def add_part(self, puzzle: nyt_json.PuzzleResult, name: str, offset: int, length: int):
+		if puzzle["version"] != self.__puzzle["version"]:
+			self.__parts.clear()
+		self.__puzzle = puzzle
+		self.__parts[name] = (offset, length)
+
+class Archive(object):
+	def __init__(self, path: str):
+		self.__path = path
+		self.__lock = threading.RLock()
+		self.__entries: dict[ArchiveKey, ArchiveEntry] = {}
+		self.__records: list[tuple[int, int, int, nyt_json.PuzzleResult, str]] = []
+		self.__data_end = len(FILE_HEADER)
+		self.__indexed = True
+		self.__has_tail = False
+		self.__map: mmap.mmap | None = None
+		self.__file: BinaryIO = open(path, "r+b" if os.path.exists(path) else "w+b")
+		size = os.fstat(self.__file.fileno()).st_size
+		if size == 0:
+			self.__file.write(FILE_HEADER)
+		elif self.__file.read(len(FILE_HEADER)) != FILE_HEADER:
+			raise Exception(f"{path} is not a puzzle archive")
+		elif not self.__read_index(size):
+			self.__scan(size)
+
+	@property
+	def path(self):
+		return self.__path
+
+	def __enter__(self) -> Archive:
+		return self
+
+	def __exit__(self, *_):
+		self.close()
+
+	def __len__(self):
+		return len(self.__entries)
+
+	def __contains__(self, key: ArchiveKey):
+		return key in self.__entries
+
+	def __iter__(self) -> Iterator[ArchiveEntry]:
+		return iter(list(self.__entries.values()))
+
+	def get(self, date: datetime.date | str, publish_type: str, format_type: str, title: str) -> ArchiveEntry | None:
+		print_date = date.isoformat() if isinstance(date, datetime.date) else date
+		return self.__entries.get((print_date, publish_type, format_type, title))
+
+	def query(
+		self,
+		year: int | None = None,
+		publish_type: str | None = None,
+		format_type: str | None = None
+	) -> Iterator[ArchiveEntry]:
+		prefix = f"{year:0>4}-" if year is not None else ""
+		for entry in self:
+			(print_date, entry_publish_type, entry_format_type, _) = entry.key
+			if (
+				print_date.startswith(prefix)
+				and (publish_type is None or entry_publish_type.lower() == publish_type.lower())
+				and (format_type is None or entry_format_type.lower() == format_type.lower())
+			):
+				yield entry
+
+	def is_current(self, puzzle: nyt_json.PuzzleResult) -> bool:
+		parts = expected_parts(puzzle)
+		return len(parts) > 0 and all(self.has_part(puzzle, part) for part in parts)
+
+	def is_outdated(self, puzzle: nyt_json.PuzzleResult) -> bool:
+		entry = self.__entries.get(archive_key(puzzle))
+		return entry is not None and entry.puzzle["version"] != puzzle["version"]
+
+	def has_part(self, puzzle: nyt_json.PuzzleResult, part: str) -> bool:
+		entry = self.__entries.get(archive_key(puzzle))
+		return (
+			entry is not None
+			and entry.puzzle["version"] == puzzle["version"]
+			and part in entry.parts
+		)
+
+	def read(self, entry: ArchiveEntry, part: str = PUZZLE_PART) -> bytes:
+		(offset, length) = entry.parts[part]
+		with self.__lock:
+			return self.__mapped()[offset:offset + length]
+
+	def load(self, entry: ArchiveEntry, part: str = PUZZLE_PART) -> crossword.Puzzle | acrostic.Acrostic:
+		(offset, _) = entry.parts[part]
+		with self.__lock:
+			return cwb.loads_cwb(self.__mapped(), offset)
+
+	def append(self, puzzle: nyt_json.PuzzleResult, part: str, data: bytes):
+		meta = json.dumps({"puzzle": puzzle, "part": part}).encode("utf-8")
+		with self.__lock:
+			self.__truncate_tail()
+			self.__indexed = False
+			offset = self.__data_end
+			self.__file.seek(offset)
+			self.__file.write(ENTRY_HEADER.pack(ENTRY_MAGIC, len(meta), len(data)))
+			self.__file.write(meta)
+			self.__file.write(data)
+			self.__data_end = self.__file.tell()
+			self.__add(offset, len(meta), len(data), puzzle, part)
+
+	def flush(self):
+		with self.__lock:
+			if self.__indexed:
+				return
+			index = json.dumps(self.__records).encode("utf-8")
+			self.__truncate_tail()
+			self.__file.seek(self.__data_end)
+			self.__file.write(ENTRY_HEADER.pack(INDEX_MAGIC, 0, len(index)))
+			self.__file.write(index)
+			self.__file.write(TRAILER.pack(self.__data_end, TRAILER_MAGIC))
+			self.__file.flush()
+			self.__indexed = True
+			self.__has_tail = True
+
+	def close(self):
+		with self.__lock:
+			if self.__file.closed:
+				return
+			self.flush()
+			self.__close_map()
+			self.__file.close()
+
+	def __add(self, offset: int, meta_length: int, data_length: int, puzzle: nyt_json.PuzzleResult, part: str):
+		self.__records.append((offset, meta_length, data_length, puzzle, part))
+		key = archive_key(puzzle)
+		entry = self.__entries.get(key)
+		if entry is None:
+			entry = ArchiveEntry(puzzle)
+			self.__entries[key] = entry
+		entry.add_part(puzzle, part, offset + ENTRY_HEADER.size + meta_length, data_length)
+
+	def __read_index(self, size: int) -> bool:
+		if size < len(FILE_HEADER) + ENTRY_HEADER.size + TRAILER.size:
+			return False
+		self.__file.seek(size - TRAILER.size)
+		(index_offset, magic) = TRAILER.unpack(self.__file.read(TRAILER.size))
+		if magic != TRAILER_MAGIC or index_offset + ENTRY_HEADER.size > size - TRAILER.size:
+			return False
+		self.__file.seek(index_offset)
+		(magic, _, index_length) = ENTRY_HEADER.unpack(self.__file.read(ENTRY_HEADER.size))
+		if magic != INDEX_MAGIC or index_offset + ENTRY_HEADER.size + index_length + TRAILER.size != size:
+			return False
+		for (offset, meta_length, data_length, puzzle, part) in json.loads(self.__file.read(index_length)):
+			self.__add(offset, meta_length, data_length, puzzle, part)
+		self.__data_end = index_offset
+		self.__has_tail = True
+		return True
+
+	def __scan(self, size: int):
+		offset = len(FILE_HEADER)
+		while offset + ENTRY_HEADER.size <= size:
+			self.__file.seek(offset)
+			(magic, meta_length, data_length) = ENTRY_HEADER.unpack(self.__file.read(ENTRY_HEADER.size))
+			end = offset + ENTRY_HEADER.size + meta_length + data_length
+			if magic not in (ENTRY_MAGIC, INDEX_MAGIC) or end > size:
+				break
+			if magic == ENTRY_MAGIC:
+				meta = json.loads(self.__file.read(meta_length))
+				self.__add(offset, meta_length, data_length, meta["puzzle"], meta["part"])
+				self.__data_end = end
+			offset = end
+		self.__indexed = False
+		self.__has_tail = self.__data_end < size
+
+	def __truncate_tail(self):
+		if self.__has_tail:
+			self.__close_map()
+			self.__file.truncate(self.__data_end)
+			self.__has_tail = False
+
+	def __mapped(self) -> mmap.mmap:
+		if self.__map is None or len(self.__map) < self.__data_end:
+			self.__close_map()
+			self.__file.flush()
+			self.__map = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+		return self.__map
+
+	def __close_map(self):
+		if self.__map is not None:
+			self.__map.close()
+			self.__map = None
\ No newline at end of file
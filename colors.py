@@ -0,0 +1,40 @@
+import re
+
+class Color(object):
+	__slots__ = ("__red", "__green", "__blue")
+
+	def __init__(self, red: int, green: int, blue: int):
+		self.__red = red
+		self.__green = green
+		self.__blue = blue
+	
+	def to_pixel(self):
+		return (self.__red, self.__green, self.__blue, 0xff)
+
+	def __str__(self):
+		return f"({self.__red}, {self.__green}, {self.__blue})"
+
+	def hex(self):
+		return f"#{self.__red:0>2x}{self.__green:0>2x}{self.__blue:0>2x}"
+	
+	@staticmethod
+	def from_hex(hex: str) -> Color:
+		match = Color.__color_expr.match(hex)
+		if match is None:
+			raise ValueError(f"Invalid color: {hex}")
+		(red, green, blue) = match.groups()
+		return Color(
+			int(red, 16),
+			int(green ,16),
+			int(blue, 16)
+		)
+
+	__color_expr = re.compile(r"#([\da-f]{2})([\da-f]{2})([\da-f]{2})", re.I)
+
+	Black: Color
+	White: Color
+	Gray: Color
+
+Color.Black = Color(0x00, 0x00, 0x00)
+Color.White = Color(0xff, 0xff, 0xff)
+Color.Gray = Color(0x80, 0x80, 0x80)
\ No newline at end of file
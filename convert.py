@@ -0,0 +1,159 @@
+import argparse
+import functools
+import glob
+import os
+import sys
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+import acrostic
+import crossword
+import cwb
+import jpz
+import puz
+import text
+
+def crossword_only(load: Callable[[str], crossword.Puzzle | acrostic.Acrostic]) -> Callable[[str], crossword.Puzzle]:
+	def load_crossword(file_path: str) -> crossword.Puzzle:
+		puzzle = load(file_path)
+		if not isinstance(puzzle, crossword.Puzzle):
+			raise ValueError("Acrostics cannot be converted")
+		return puzzle
+	return load_crossword
+
+READERS: dict[str, Callable[[str], crossword.Puzzle]] = {
+	".cwb": crossword_only(cwb.load_cwb),
+	".jpz": crossword_only(jpz.load_jpz),
+	".puz": puz.load_puz,
+	".txt": text.load_text
+}
+
+def save_png(puzzle: crossword.Puzzle, file_path: str):
+	import image
+	image.draw_grid(puzzle.grid, file_path)
+
+def save_svg(puzzle: crossword.Puzzle, file_path: str):
+	import svg
+	svg.save_svg(puzzle.grid, file_path)
+
+WRITERS: dict[str, Callable[[crossword.Puzzle, str], None]] = {
+	"cwb": cwb.save_cwb,
+	"puz": puz.save_puz,
+	"jpz": jpz.save_crossword_jpz,
+	"txt": text.save_text,
+	"png": save_png,
+	"svg": save_svg
+}
+
+def input_files(patterns: list[str]) -> list[str]:
+	paths: list[str] = []
+	for pattern in patterns:
+		if os.path.isdir(pattern):
+			for (directory, _, names) in os.walk(pattern):
+				paths.extend(
+					os.path.join(directory, name) for name in sorted(names)
+					if os.path.splitext(name)[1].lower() in READERS
+				)
+		else:
+			paths.extend(sorted(glob.glob(pattern, recursive=True)))
+	return paths
+
+def output_path(input_path: str, output_format: str, output_dir: str | None) -> str:
+	stem = os.path.splitext(os.path.basename(input_path))[0]
+	return os.path.join(output_dir or os.path.dirname(input_path), f"{stem}.{output_format}")
+
+def check_outputs(paths: list[str], formats: list[str], output_dir: str | None):
+	inputs = {os.path.abspath(path) for path in paths}
+	owners: dict[str, str] = {}
+	collisions: list[str] = []
+	for path in paths:
+		for output_format in formats:
+			target = os.path.abspath(output_path(path, output_format, output_dir))
+			if target == os.path.abspath(path):
+				continue
+			if target in inputs:
+				collisions.append(f"{path} would overwrite input {target}")
+			elif target in owners:
+				collisions.append(f"{path} and {owners[target]} would both write {target}")
+			else:
+				owners[target] = path
+	if collisions:
+		raise ValueError("Conflicting output files:\n" + "\n".join(collisions))
+
+def convert_file(
+	input_path: str,
+	formats: list[str],
+	output_dir: str | None
+) -> tuple[int, str | None]:
+	extension = os.path.splitext(input_path)[1]
+	try:
+		reader = READERS.get(extension.lower())
+		if reader is None:
+			raise ValueError(f"Unknown input format {extension}")
+		puzzle = reader(input_path)
+		written = 0
+		for output_format in formats:
+			target = output_path(input_path, output_format, output_dir)
+			if os.path.abspath(target) == os.path.abspath(input_path):
+				continue
+			WRITERS[output_format](puzzle, target)
+			written += 1
+		return (written, None)
+	except Exception as e:
+		return (0, f"{type(e).__name__}: {e}")
+
+def convert(
+	patterns: list[str],
+	formats: list[str],
+	output_dir: str | None = None,
+	jobs: int | None = None
+) -> int:
+	paths = input_files(patterns)
+	check_outputs(paths, formats, output_dir)
+	if output_dir is not None:
+		os.makedirs(output_dir, exist_ok=True)
+	start = time.perf_counter()
+	converted = 0
+	outputs = 0
+	errors = 0
+	with ProcessPoolExecutor(max_workers=jobs) as executor:
+		results = executor.map(
+			functools.partial(convert_file, formats=formats, output_dir=output_dir),
+			paths,
+			chunksize=max(1, len(paths) // (4 * (jobs or os.cpu_count() or 1)))
+		)
+		for (path, (written, error)) in zip(paths, results):
+			if error is not None:
+				errors += 1
+				sys.stderr.write(f"Error converting {path}: {error}\n")
+			else:
+				converted += 1
+				outputs += written
+	elapsed = time.perf_counter() - start
+	rate = converted / elapsed if elapsed > 0 else 0
+	print(f"Converted {converted} of {len(paths)} puzzles ({outputs} files) in {elapsed:.2f}s, {rate:.1f} puzzles/s, {errors} errors")
+	return errors
+
+def main(argv: list[str]):
+	parser = argparse.ArgumentParser(description="Convert puzzles between formats")
+	parser.add_argument("inputs", nargs="+", help="input files, directories or glob patterns")
+	parser.add_argument(
+		"-t", "--to",
+		required=True,
+		help=f"comma-separated output formats ({', '.join(WRITERS)})"
+	)
+	parser.add_argument("-o", "--output", help="output directory (defaults to each input's directory)")
+	parser.add_argument("-j", "--jobs", type=int, help="worker processes (defaults to the number of cores)")
+	args = parser.parse_args(argv)
+	formats: list[str] = [name.strip().lower() for name in args.to.split(",") if name.strip()]
+	unknown = [name for name in formats if name not in WRITERS]
+	if unknown:
+		parser.error(f"unknown output format {', '.join(unknown)}")
+	try:
+		errors = convert(args.inputs, formats, args.output, args.jobs)
+	except ValueError as e:
+		parser.error(str(e))
+	return 1 if errors > 0 else 0
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
\ No newline at end of file
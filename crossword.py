@@ -1,13 +1,25 @@
+from abc import ABC, abstractmethod
+from array import array
 from enum import Enum
-from typing import Generator, Iterator
-from bs4 import BeautifulSoup
-import image
+from typing import Generator, Iterator, TYPE_CHECKING
+import sys
+import colors
+import richtext
+
+if TYPE_CHECKING:
+	from bs4 import BeautifulSoup
 
 class Square(object):
-	pass
+	__slots__ = ()
 
 class BlackSquare(Square):
-	pass
+	__slots__ = ()
+	__instance: BlackSquare | None = None
+
+	def __new__(cls):
+		if BlackSquare.__instance is None:
+			BlackSquare.__instance = super().__new__(cls)
+		return BlackSquare.__instance
 
 class SquareSide(Enum):
 	TOP = 0
@@ -16,10 +28,12 @@ class SquareSide(Enum):
 	LEFT = 3
 
 class WhiteSquare(Square):
+	__slots__ = ("__answer", "__color", "__is_circled", "__bars")
+
 	def __init__(
 			self,
 			answer: str | None = None,
-			color: image.Color | None = None,
+			color: colors.Color | None = None,
 			is_circled: bool = False,
 			bars: frozenset[SquareSide] = frozenset()
 		):
@@ -43,55 +57,154 @@ class WhiteSquare(Square):
 	def has_bar(self, bar: SquareSide):
 		return bar in self.__bars
 
-class Grid(object):
+class Direction(Enum):
+	ACROSS = 0
+	DOWN = 1
+
+class Word(object):
+	def __init__(self, number: int, direction: Direction, cells: list[tuple[int, int]]):
+		self.__number = number
+		self.__direction = direction
+		self.__cells = cells
+
+	@property
+	def number(self):
+		return self.__number
+
+	@property
+	def direction(self):
+		return self.__direction
+
+	@property
+	def cells(self):
+		return self.__cells
+
+class Numbering(object):
 	def __init__(self, squares: list[list[Square]]):
-		if len(squares) == 0 or len(squares[0]) == 0:
-			raise Exception("Empty grid")
-		if any(len(row) != len(squares[0]) for row in squares):
-			raise Exception("Ragged grid")
-		self.__squares = squares
+		rows = len(squares)
+		cols = len(squares[0])
+		continues_right = [
+			[
+				col + 1 < cols
+				and continues(row_squares[col], row_squares[col + 1], SquareSide.RIGHT, SquareSide.LEFT)
+				for col in range(cols)
+			]
+			for row_squares in squares
+		]
+		continues_down = [
+			[
+				row + 1 < rows
+				and continues(squares[row][col], squares[row + 1][col], SquareSide.BOTTOM, SquareSide.TOP)
+				for col in range(cols)
+			]
+			for row in range(rows)
+		]
+		self.__numbers: dict[tuple[int, int], int] = {}
+		self.__words: list[Word] = []
+		self.__across: list[Word] = []
+		self.__down: list[Word] = []
+		self.__across_at: dict[tuple[int, int], Word] = {}
+		self.__down_at: dict[tuple[int, int], Word] = {}
+		for row in range(rows):
+			for col in range(cols):
+				is_across = continues_right[row][col] and not (col > 0 and continues_right[row][col - 1])
+				is_down = continues_down[row][col] and not (row > 0 and continues_down[row - 1][col])
+				if not (is_across or is_down):
+					continue
+				number = len(self.__numbers) + 1
+				self.__numbers[row, col] = number
+				if is_across:
+					end = col
+					while continues_right[row][end]:
+						end += 1
+					word = Word(number, Direction.ACROSS, [(row, c) for c in range(col, end + 1)])
+					self.__add_word(word, self.__across, self.__across_at)
+				if is_down:
+					end = row
+					while continues_down[end][col]:
+						end += 1
+					word = Word(number, Direction.DOWN, [(r, col) for r in range(row, end + 1)])
+					self.__add_word(word, self.__down, self.__down_at)
+
+	def __add_word(self, word: Word, words: list[Word], word_at: dict[tuple[int, int], Word]):
+		self.__words.append(word)
+		words.append(word)
+		for cell in word.cells:
+			word_at[cell] = word
 
-	def __getitem__(self, index: tuple[int, int]):
-		(row, col) = index
-		if (
-			0 <= row < self.rows
-			and 0 <= col < self.cols
-		):
-			return self.__squares[row][col]
-		return BlackSquare()
-	
 	@property
-	def rows(self):
-		return len(self.__squares)
-	
+	def numbers(self):
+		return self.__numbers
+
 	@property
-	def cols(self):
-		return len(self.__squares[0])
-	
+	def words(self):
+		return self.__words
+
+	@property
+	def across(self):
+		return self.__across
+
+	@property
+	def down(self):
+		return self.__down
+
+	def number_at(self, row: int, col: int) -> int | None:
+		return self.__numbers.get((row, col))
+
+	def across_word_at(self, row: int, col: int) -> Word | None:
+		return self.__across_at.get((row, col))
+
+	def down_word_at(self, row: int, col: int) -> Word | None:
+		return self.__down_at.get((row, col))
+
+def continues(square1: Square, square2: Square, side1: SquareSide, side2: SquareSide) -> bool:
+	return (
+		isinstance(square1, WhiteSquare)
+		and isinstance(square2, WhiteSquare)
+		and not square1.has_bar(side1)
+		and not square2.has_bar(side2)
+	)
+
+def check_shape(squares: list[list[Square]]):
+	if len(squares) == 0 or len(squares[0]) == 0:
+		raise Exception("Empty grid")
+	if any(len(row) != len(squares[0]) for row in squares):
+		raise Exception("Ragged grid")
+
+class BaseGrid(ABC):
+	def __init__(self):
+		self.__numbering: Numbering | None = None
+
+	@abstractmethod
+	def __getitem__(self, index: tuple[int, int]) -> Square: ...
+
+	@property
+	@abstractmethod
+	def rows(self) -> int: ...
+
+	@property
+	@abstractmethod
+	def cols(self) -> int: ...
+
 	def __iter__(self) -> Iterator[tuple[tuple[int, int], Square]]:
 		for row in range(self.rows):
 			for col in range(self.cols):
 				yield ((row, col), self[row, col])
 
+	def square_rows(self) -> list[list[Square]]:
+		return [[self[row, col] for col in range(self.cols)] for row in range(self.rows)]
+
+	@property
+	def numbering(self) -> Numbering:
+		if self.__numbering is None:
+			self.__numbering = Numbering(self.square_rows())
+		return self.__numbering
+
 	def word_continues_right(self, row: int, col: int) -> bool:
-		square1 = self[row, col]
-		square2 = self[row, col + 1]
-		return (
-			isinstance(square1, WhiteSquare)
-			and isinstance(square2, WhiteSquare)
-			and not square1.has_bar(SquareSide.RIGHT)
-			and not square2.has_bar(SquareSide.LEFT)
-		)
+		return continues(self[row, col], self[row, col + 1], SquareSide.RIGHT, SquareSide.LEFT)
 	
 	def word_continues_down(self, row: int, col: int) -> bool:
-		square1 = self[row, col]
-		square2 = self[row + 1, col]
-		return (
-			isinstance(square1, WhiteSquare)
-			and isinstance(square2, WhiteSquare)
-			and not square1.has_bar(SquareSide.BOTTOM)
-			and not square2.has_bar(SquareSide.TOP)
-		)
+		return continues(self[row, col], self[row + 1, col], SquareSide.BOTTOM, SquareSide.TOP)
 
 	def is_across_start(self, row: int, col: int):
 		return (
@@ -119,10 +232,204 @@ class Grid(object):
 			row += 1
 			yield row
 
+class Grid(BaseGrid):
+	def __init__(self, squares: list[list[Square]]):
+		super().__init__()
+		check_shape(squares)
+		self.__squares = squares
+
+	def __getitem__(self, index: tuple[int, int]) -> Square:
+		(row, col) = index
+		if (
+			0 <= row < self.rows
+			and 0 <= col < self.cols
+		):
+			return self.__squares[row][col]
+		return BlackSquare()
+	
+	@property
+	def rows(self):
+		return len(self.__squares)
+	
+	@property
+	def cols(self):
+		return len(self.__squares[0])
+	
+	def __iter__(self) -> Iterator[tuple[tuple[int, int], Square]]:
+		for (row, row_squares) in enumerate(self.__squares):
+			for (col, square) in enumerate(row_squares):
+				yield ((row, col), square)
+
+	def square_rows(self) -> list[list[Square]]:
+		return self.__squares
+
+WHITE_FLAG = 0x01
+CIRCLED_FLAG = 0x02
+BAR_SHIFT = 2
+BAR_SETS = [
+	frozenset(side for side in SquareSide if mask & (1 << side.value))
+	for mask in range(1 << len(SquareSide))
+]
+
+MAX_ANSWERS = 0x10000
+MAX_COLORS = 0x100
+
+class PackedGrid(BaseGrid):
+	def __init__(self, squares: list[list[Square]]):
+		super().__init__()
+		check_shape(squares)
+		self.__rows = len(squares)
+		self.__cols = len(squares[0])
+		self.__flags = bytearray(self.__rows * self.__cols)
+		self.__answer_indexes = array("H", bytes(2 * self.__rows * self.__cols))
+		self.__color_indexes = array("B", bytes(self.__rows * self.__cols))
+		self.__answers: list[str | None] = [None]
+		self.__palette: list[colors.Color | None] = [None]
+		self.__squares: dict[int, WhiteSquare] | None = None
+		answer_lookup: dict[str, int] = {}
+		palette_lookup: dict[str, int] = {}
+		for (row, row_squares) in enumerate(squares):
+			for (col, square) in enumerate(row_squares):
+				if not isinstance(square, WhiteSquare):
+					continue
+				index = row * self.__cols + col
+				flags = WHITE_FLAG
+				if square.is_circled:
+					flags |= CIRCLED_FLAG
+				for side in SquareSide:
+					if square.has_bar(side):
+						flags |= 1 << (side.value + BAR_SHIFT)
+				self.__flags[index] = flags
+				if square.answer is not None:
+					if square.answer not in answer_lookup:
+						if len(self.__answers) >= MAX_ANSWERS:
+							raise Exception("Too many answers")
+						answer_lookup[square.answer] = len(self.__answers)
+						self.__answers.append(sys.intern(square.answer))
+					self.__answer_indexes[index] = answer_lookup[square.answer]
+				if square.color is not None:
+					key = square.color.hex()
+					if key not in palette_lookup:
+						if len(self.__palette) >= MAX_COLORS:
+							raise Exception("Too many colors")
+						palette_lookup[key] = len(self.__palette)
+						self.__palette.append(square.color)
+					self.__color_indexes[index] = palette_lookup[key]
+
+	@staticmethod
+	def from_grid(grid: BaseGrid) -> PackedGrid:
+		return PackedGrid([
+			[grid[row, col] for col in range(grid.cols)]
+			for row in range(grid.rows)
+		])
+
+	@staticmethod
+	def from_packed(
+		rows: int,
+		cols: int,
+		flags: bytearray,
+		answers: list[str | None],
+		answer_indexes: array,
+		palette: list[colors.Color | None],
+		color_indexes: array
+	) -> PackedGrid:
+		if rows == 0 or cols == 0:
+			raise Exception("Empty grid")
+		if not len(flags) == len(answer_indexes) == len(color_indexes) == rows * cols:
+			raise Exception("Packed grid has the wrong size")
+		if len(answers) > MAX_ANSWERS or len(palette) > MAX_COLORS:
+			raise Exception("Packed grid tables are too large")
+		if answers[0] is not None or palette[0] is not None:
+			raise Exception("Packed grid tables must start with None")
+		if (
+			max(answer_indexes, default=0) >= len(answers)
+			or max(color_indexes, default=0) >= len(palette)
+		):
+			raise Exception("Packed grid index out of range")
+		grid = PackedGrid.__new__(PackedGrid)
+		BaseGrid.__init__(grid)
+		grid.__rows = rows
+		grid.__cols = cols
+		grid.__flags = flags
+		grid.__answer_indexes = answer_indexes
+		grid.__color_indexes = color_indexes
+		grid.__answers = answers
+		grid.__palette = palette
+		grid.__squares = None
+		return grid
+
+	@property
+	def flags(self):
+		return self.__flags
+
+	@property
+	def answers(self):
+		return self.__answers
+
+	@property
+	def answer_indexes(self):
+		return self.__answer_indexes
+
+	@property
+	def palette(self):
+		return self.__palette
+
+	@property
+	def color_indexes(self):
+		return self.__color_indexes
+
+	def __getitem__(self, index: tuple[int, int]) -> Square:
+		(row, col) = index
+		if (
+			0 <= row < self.__rows
+			and 0 <= col < self.__cols
+		):
+			return self.__square(row * self.__cols + col)
+		return BlackSquare()
+
+	def __square(self, index: int) -> Square:
+		flags = self.__flags[index]
+		if not flags & WHITE_FLAG:
+			return BlackSquare()
+		answer_index = self.__answer_indexes[index]
+		color_index = self.__color_indexes[index]
+		key = (answer_index << 16) | (color_index << 8) | flags
+		if self.__squares is None:
+			self.__squares = {}
+		square = self.__squares.get(key)
+		if square is None:
+			square = WhiteSquare(
+				answer=self.__answers[answer_index],
+				color=self.__palette[color_index],
+				is_circled=bool(flags & CIRCLED_FLAG),
+				bars=BAR_SETS[flags >> BAR_SHIFT]
+			)
+			self.__squares[key] = square
+		return square
+
+	@property
+	def rows(self):
+		return self.__rows
+
+	@property
+	def cols(self):
+		return self.__cols
+
+	def __iter__(self) -> Iterator[tuple[tuple[int, int], Square]]:
+		for row in range(self.__rows):
+			for col in range(self.__cols):
+				yield ((row, col), self.__square(row * self.__cols + col))
+
+	def square_rows(self) -> list[list[Square]]:
+		return [
+			[self.__square(row * self.__cols + col) for col in range(self.__cols)]
+			for row in range(self.__rows)
+		]
+
 class Puzzle(object):
 	def __init__(
 		self,
-		grid: Grid,
+		grid: BaseGrid,
 		across: dict[int, FormattableText],
 		down: dict[int, FormattableText],
 		title: FormattableText | None = None,
@@ -172,29 +479,57 @@ class Puzzle(object):
 	def down_clues(self):
 		return self.__down
 
+	def clue(self, word: Word) -> FormattableText:
+		return (
+			self.__across if word.direction == Direction.ACROSS
+			else self.__down
+		)[word.number]
+
 class FormattableText(object):
-	def __init__(self, text: str | None = None, html: BeautifulSoup | str | None = None):
-		html = BeautifulSoup(html, "html.parser") if isinstance(html, str) else html
-		if text is not None and html is None:
-			self.__text = text
-			self.__html = BeautifulSoup()
-			for (i, line) in enumerate(text.split("\n")):
-				if i > 0:
-					self.__html.append(self.__html.new_tag("br"))
-				self.__html.append(line)
-		elif text is None and html is not None:
-			self.__html = html
-			self.__text = self.__html.getText()
-		elif text is not None and html is not None:
-			self.__html = html
-			self.__text = text
-		else:
+	def __init__(self, text: str | None = None, html: richtext.RichText | BeautifulSoup | str | None = None):
+		if text is None and html is None:
 			raise ValueError("Expected one non-None value")
+		self.__text = text
+		self.__html = html if isinstance(html, richtext.RichText) else None
+		self.__html_source = (
+			None if html is None or isinstance(html, richtext.RichText)
+			else html if isinstance(html, str)
+			else str(html)
+		)
+		self.__html_string: str | None = None
+
+	@property
+	def is_plain(self) -> bool:
+		return self.__html is None and self.__html_source is None
 
 	@property
-	def html(self) -> BeautifulSoup:
+	def html(self) -> richtext.RichText:
+		if self.__html is None:
+			self.__html = (
+				richtext.RichText.from_html(self.__html_source) if self.__html_source is not None
+				else richtext.RichText.from_text(self.text)
+			)
 		return self.__html
 
+	@property
+	def html_string(self) -> str:
+		if self.__html_string is None:
+			self.__html_string = (
+				"<br/>".join(
+					richtext.escape_text(line)
+					for line in self.text.split("\n")
+				) if self.is_plain
+				else self.html.html()
+			)
+		return self.__html_string
+
+	@property
+	def soup(self) -> BeautifulSoup:
+		from bs4 import BeautifulSoup
+		return BeautifulSoup(self.html_string, "html.parser")
+
 	@property
 	def text(self) -> str:
+		if self.__text is None:
+			self.__text = self.html.text()
 		return self.__text
\ No newline at end of file
@@ -1,19 +1,252 @@
+import functools
+import gzip
+import hashlib
+import http.server
+import itertools
 import json
-from lzstring import LZString
-from typing import Any, Literal, TypedDict, NotRequired
+import threading
+import urllib.parse
+from typing import Literal, TypedDict, NotRequired
 import webbrowser
 import crossword
 
-def open_puzzle(puzzle: crossword.Puzzle):
-	webbrowser.open(puzzle_url(puzzle))
+SOLVER_URL = "https://crosswordnexus.github.io/html5-crossword-solver/"
+SOLVER_ORIGIN = "https://crosswordnexus.github.io"
+
+URI_SAFE_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+-$"
+BIT_REVERSED_ALPHABET = [
+	URI_SAFE_ALPHABET[int(f"{value:06b}"[::-1], 2)] for value in range(64)
+]
+
+def open_puzzle(
+	puzzle: crossword.Puzzle,
+	local: bool = False,
+	solver_dir: str | None = None,
+	wait: bool = False
+):
+	webbrowser.open(
+		local_puzzle_url(puzzle, solver_dir) if local
+		else puzzle_url(puzzle)
+	)
+	if local and wait:
+		local_server(solver_dir).wait()
 
 def puzzle_url(puzzle: crossword.Puzzle) -> str:
-	return f"https://crosswordnexus.github.io/html5-crossword-solver/#{
-		LZString.compressToEncodedURIComponent(
-			json.dumps(clear_nones(to_js_puzzle(puzzle)))
-		)
+	return f"{SOLVER_URL}#{
+		compress_to_encoded_uri_component(puzzle_json(puzzle))
 	}"
 
+def local_puzzle_url(puzzle: crossword.Puzzle, solver_dir: str | None = None) -> str:
+	server = local_server(solver_dir)
+	payload_url = server.add(puzzle)
+	solver_url = server.url if solver_dir is not None else SOLVER_URL
+	return f"{solver_url}?file={urllib.parse.quote(payload_url, safe="")}"
+
+def puzzle_json(puzzle: crossword.Puzzle) -> str:
+	return json.dumps(to_js_puzzle(puzzle), separators=(",", ":"))
+
+class PuzzleServer(object):
+	def __init__(self, solver_dir: str | None = None, host: str = "127.0.0.1", port: int = 0):
+		self.__solver_dir = solver_dir
+		self.__host = host
+		self.__payloads: dict[str, bytes] = {}
+		self.__lock = threading.Lock()
+		self.__server = http.server.ThreadingHTTPServer(
+			(host, port),
+			functools.partial(PuzzleRequestHandler, self)
+		)
+		self.__server.daemon_threads = True
+		self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+		self.__thread.start()
+
+	@property
+	def solver_dir(self):
+		return self.__solver_dir
+
+	@property
+	def url(self) -> str:
+		return f"http://{self.__host}:{self.__server.server_port}/"
+
+	@property
+	def allowed_origin(self) -> str | None:
+		return SOLVER_ORIGIN if self.__solver_dir is None else None
+
+	def add(self, puzzle: crossword.Puzzle) -> str:
+		data = puzzle_json(puzzle).encode("utf-8")
+		key = hashlib.sha256(data).hexdigest()[:32]
+		with self.__lock:
+			if key not in self.__payloads:
+				self.__payloads[key] = gzip.compress(data, mtime=0)
+		return f"{self.url}puzzles/{key}.json"
+
+	def payload(self, key: str) -> bytes | None:
+		with self.__lock:
+			return self.__payloads.get(key)
+
+	def wait(self):
+		try:
+			while self.__thread.is_alive():
+				self.__thread.join(0.5)
+		except KeyboardInterrupt:
+			self.close()
+
+	def close(self):
+		self.__server.shutdown()
+		self.__server.server_close()
+		self.__thread.join()
+
+class PuzzleRequestHandler(http.server.SimpleHTTPRequestHandler):
+	def __init__(self, puzzle_server: PuzzleServer, *args, **kwargs):
+		self.puzzle_server = puzzle_server
+		super().__init__(*args, directory=puzzle_server.solver_dir, **kwargs)
+
+	def do_GET(self):
+		self.handle_request(True)
+
+	def do_HEAD(self):
+		self.handle_request(False)
+
+	def handle_request(self, send_body: bool):
+		path = urllib.parse.urlsplit(self.path).path
+		if path.startswith("/puzzles/") and path.endswith(".json"):
+			self.send_payload(path[len("/puzzles/"):-len(".json")], send_body)
+		elif self.puzzle_server.solver_dir is None:
+			self.send_error(404)
+		elif send_body:
+			super().do_GET()
+		else:
+			super().do_HEAD()
+
+	def send_payload(self, key: str, send_body: bool):
+		payload = self.puzzle_server.payload(key)
+		if payload is None:
+			self.send_error(404)
+			return
+		etag = f"\"{key}\""
+		if matches_etag(self.headers.get("If-None-Match"), etag):
+			self.send_response(304)
+			self.send_cache_headers(etag)
+			self.end_headers()
+			return
+		compressed = accepts_gzip(self.headers.get("Accept-Encoding"))
+		body = payload if compressed else gzip.decompress(payload)
+		self.send_response(200)
+		self.send_header("Content-Type", "application/json; charset=utf-8")
+		if compressed:
+			self.send_header("Content-Encoding", "gzip")
+		self.send_header("Content-Length", str(len(body)))
+		self.send_cache_headers(etag)
+		self.end_headers()
+		if send_body:
+			self.wfile.write(body)
+
+	def send_cache_headers(self, etag: str):
+		self.send_header("ETag", etag)
+		self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+		self.send_header("Vary", "Accept-Encoding")
+
+	def end_headers(self):
+		origin = self.puzzle_server.allowed_origin
+		if origin is not None:
+			self.send_header("Access-Control-Allow-Origin", origin)
+		super().end_headers()
+
+	def log_message(self, format: str, *args):
+		pass
+
+def matches_etag(header: str | None, etag: str) -> bool:
+	if header is None:
+		return False
+	tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+	return "*" in tags or etag in tags
+
+def accepts_gzip(header: str | None) -> bool:
+	if header is None:
+		return False
+	for coding in header.split(","):
+		(name, _, params) = coding.partition(";")
+		if name.strip().lower() in ("gzip", "*"):
+			params = params.strip()
+			if not params.startswith("q="):
+				return True
+			try:
+				return float(params.removeprefix("q=")) > 0
+			except ValueError:
+				return False
+	return False
+
+local_servers: dict[str | None, PuzzleServer] = {}
+local_servers_lock = threading.Lock()
+
+def local_server(solver_dir: str | None = None) -> PuzzleServer:
+	with local_servers_lock:
+		server = local_servers.get(solver_dir)
+		if server is None:
+			server = PuzzleServer(solver_dir)
+			local_servers[solver_dir] = server
+		return server
+
+def compress_to_encoded_uri_component(uncompressed: str) -> str:
+	dictionary: dict[str, int] = {}
+	to_create: set[str] = set()
+	dict_size = 3
+	num_bits = 2
+	enlarge_in = 2
+	output: list[str] = []
+	alphabet = BIT_REVERSED_ALPHABET
+	pending = 0
+	pending_bits = 0
+	phrase = ""
+	extended = ""
+	for char in itertools.chain(uncompressed, [None]):
+		if char is not None:
+			if char not in dictionary:
+				dictionary[char] = dict_size
+				dict_size += 1
+				to_create.add(char)
+			extended = phrase + char
+			if extended in dictionary:
+				phrase = extended
+				continue
+		elif phrase == "":
+			break
+		if phrase in to_create:
+			code = ord(phrase[0])
+			if code < 256:
+				pending |= code << (pending_bits + num_bits)
+				pending_bits += num_bits + 8
+			else:
+				pending |= (1 | ((code & 0xffff) << num_bits)) << pending_bits
+				pending_bits += num_bits + 16
+			enlarge_in -= 1
+			if enlarge_in == 0:
+				enlarge_in = 1 << num_bits
+				num_bits += 1
+			to_create.remove(phrase)
+		else:
+			pending |= dictionary[phrase] << pending_bits
+			pending_bits += num_bits
+		enlarge_in -= 1
+		if enlarge_in == 0:
+			enlarge_in = 1 << num_bits
+			num_bits += 1
+		while pending_bits >= 6:
+			output.append(alphabet[pending & 0x3f])
+			pending >>= 6
+			pending_bits -= 6
+		if char is not None:
+			dictionary[extended] = dict_size
+			dict_size += 1
+			phrase = char
+	pending |= 2 << pending_bits
+	pending_bits += num_bits
+	while pending_bits >= 6:
+		output.append(alphabet[pending & 0x3f])
+		pending >>= 6
+		pending_bits -= 6
+	output.append(alphabet[pending & 0x3f])
+	return "".join(output)
+
 class JSPuzzle(TypedDict):
 	metadata: Metadata
 	cells: list[BlockCell | LetterCell]
@@ -21,11 +254,11 @@ class JSPuzzle(TypedDict):
 	clues: list[ClueSet]
 
 class Metadata(TypedDict):
-	title: str | None
-	author: str | None
-	copyright: str | None
-	description: str | None
-	intro: str | None
+	title: NotRequired[str]
+	author: NotRequired[str]
+	copyright: NotRequired[str]
+	description: NotRequired[str]
+	intro: NotRequired[str]
 	fakeclues: bool
 	realwords: bool
 	autofill: bool
@@ -44,16 +277,16 @@ class BlockCell(TypedDict):
 LetterCell = TypedDict("LetterCell", {
 	"x": int,
 	"y": int,
-	"solution": str | None,
-	"number": str | None,
+	"solution": NotRequired[str],
+	"number": NotRequired[str],
 	"is_void": bool,
 	"clue": bool,
-	"top-bar": bool | None,
-	"bottom-bar": bool | None,
-	"left-bar": bool | None,
-	"right-bar": bool | None,
-	"background-color": str | None,
-	"background-shape": str | None
+	"top-bar": NotRequired[bool],
+	"bottom-bar": NotRequired[bool],
+	"left-bar": NotRequired[bool],
+	"right-bar": NotRequired[bool],
+	"background-color": NotRequired[str],
+	"background-shape": NotRequired[str]
 })
 
 class Word(TypedDict):
@@ -73,62 +306,51 @@ class X(TypedDict):
 	a: NotRequired[str]
 
 def to_js_puzzle(puzzle: crossword.Puzzle) -> JSPuzzle:
-	next_cell_number = 1
+	numbering = puzzle.grid.numbering
 	cells: list[BlockCell | LetterCell] = []
 	words: list[Word] = []
 	across_clues: list[Clue] = []
 	down_clues: list[Clue] = []
+	for word in numbering.words:
+		word_id = str(len(words))
+		words.append(Word(
+			id=word_id,
+			cells=[(col, row) for (row, col) in word.cells]
+		))
+		(
+			across_clues if word.direction == crossword.Direction.ACROSS
+			else down_clues
+		).append(Clue(
+			text=puzzle.clue(word).html_string,
+			word=word_id,
+			number=str(word.number)
+		))
 	for ((row, col), cell) in puzzle.grid:
 		if isinstance(cell, crossword.WhiteSquare):
-			is_across = puzzle.grid.is_across_start(row, col)
-			is_down = puzzle.grid.is_down_start(row, col)
-			if is_across or is_down:
-				number = next_cell_number
-				next_cell_number += 1
-				if is_across:
-					word_id = str(len(words))
-					words.append(Word(
-						id=word_id,
-						cells=[
-							(word_col, row)
-							for word_col in puzzle.grid.across_word_cols(row, col)
-						]
-					))
-					across_clues.append(Clue(
-						text=str(puzzle.across_clues[number].html),
-						word=word_id,
-						number=str(number)
-					))
-				if is_down:
-					word_id = str(len(words))
-					words.append(Word(
-						id=word_id,
-						cells=[
-							(col, word_row)
-							for word_row in puzzle.grid.down_word_rows(row, col)
-						]
-					))
-					down_clues.append(Clue(
-						text=str(puzzle.down_clues[number].html),
-						word=word_id,
-						number=str(number)
-					))
-			else:
-				number = None
-			cells.append(LetterCell({
+			number = numbering.number_at(row, col)
+			letter_cell: LetterCell = {
 				"x": col,
 				"y": row,
-				"solution": cell.answer,
-				"number": str(number) if number is not None else None,
 				"is_void": False,
-				"clue": False,
-				"top-bar": cell.has_bar(crossword.SquareSide.TOP) or None,
-				"bottom-bar": cell.has_bar(crossword.SquareSide.BOTTOM) or None,
-				"left-bar": cell.has_bar(crossword.SquareSide.LEFT) or None,
-				"right-bar": cell.has_bar(crossword.SquareSide.RIGHT) or None,
-				"background-color": cell.color.hex() if cell.color else None,
-				"background-shape": "circle" if cell.is_circled else None
-			}))
+				"clue": False
+			}
+			if cell.answer is not None:
+				letter_cell["solution"] = cell.answer
+			if number is not None:
+				letter_cell["number"] = str(number)
+			if cell.has_bar(crossword.SquareSide.TOP):
+				letter_cell["top-bar"] = True
+			if cell.has_bar(crossword.SquareSide.BOTTOM):
+				letter_cell["bottom-bar"] = True
+			if cell.has_bar(crossword.SquareSide.LEFT):
+				letter_cell["left-bar"] = True
+			if cell.has_bar(crossword.SquareSide.RIGHT):
+				letter_cell["right-bar"] = True
+			if cell.color:
+				letter_cell["background-color"] = cell.color.hex()
+			if cell.is_circled:
+				letter_cell["background-shape"] = "circle"
+			cells.append(letter_cell)
 		else:
 			cells.append(BlockCell(
 				x=col,
@@ -137,25 +359,27 @@ def to_js_puzzle(puzzle: crossword.Puzzle) -> JSPuzzle:
 				is_void=False,
 				clue=False
 			))
+	metadata = Metadata(
+		fakeclues=False,
+		realwords=False,
+		autofill=False,
+		crossword_type="crossword",
+		has_reveal=True,
+		width=puzzle.grid.cols,
+		height=puzzle.grid.rows
+	)
+	if puzzle.title is not None:
+		metadata["title"] = puzzle.title.html_string
+	if puzzle.author is not None:
+		metadata["author"] = puzzle.author.html_string
+	if puzzle.copyright is not None:
+		metadata["copyright"] = puzzle.copyright.html_string
+	if puzzle.note is not None:
+		metadata["description"] = puzzle.note.html_string
+		if puzzle.show_note_on_open:
+			metadata["intro"] = puzzle.note.html_string
 	return JSPuzzle(
-		metadata=Metadata(
-			title=puzzle.title and str(puzzle.title.html),
-			author=puzzle.author and str(puzzle.author.html),
-			copyright=puzzle.copyright and str(puzzle.copyright.html),
-			description=puzzle.note and str(puzzle.note.html),
-			intro=(
-				str(puzzle.note.html)
-				if puzzle.note and puzzle.show_note_on_open
-				else None
-			),
-			fakeclues=False,
-			realwords=False,
-			autofill=False,
-			crossword_type="crossword",
-			has_reveal=True,
-			width=puzzle.grid.cols,
-			height=puzzle.grid.rows
-		),
+		metadata=metadata,
 		cells=cells,
 		words=words,
 		clues=[
@@ -164,18 +388,28 @@ def to_js_puzzle(puzzle: crossword.Puzzle) -> JSPuzzle:
 		]
 	)
 
-def clear_nones(obj: Any) -> Any:
-	if isinstance(obj, dict):
-		return {
-			key: clear_nones(value)
-			for (key, value) in obj.items() # type: ignore
-			if value is not None
-		}
-	elif isinstance(obj, list):
-		return [
-			clear_nones(value)
-			for value in obj # type: ignore
-			if value is not None
+def benchmark(size: int, count: int = 50) -> float:
+	import random
+	import time
+	grid = crossword.Grid([
+		[
+			crossword.BlackSquare() if random.random() < 0.16
+			else crossword.WhiteSquare(random.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+			for _ in range(size)
 		]
-	else:
-		return obj
\ No newline at end of file
+		for _ in range(size)
+	])
+	puzzle = crossword.Puzzle(
+		grid=grid,
+		across={word.number: crossword.FormattableText(f"Across clue {word.number}") for word in grid.numbering.across},
+		down={word.number: crossword.FormattableText(f"Down clue {word.number}") for word in grid.numbering.down},
+		title=crossword.FormattableText("Benchmark")
+	)
+	start = time.perf_counter()
+	for _ in range(count):
+		puzzle_url(puzzle)
+	return count / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+	for size in (15, 21):
+		print(f"{size}x{size}: {benchmark(size):.1f} links/s")
\ No newline at end of file
@@ -0,0 +1,254 @@
+import struct
+import sys
+from array import array
+from collections.abc import Buffer
+from typing import BinaryIO
+import acrostic
+import crossword
+import files
+import colors
+
+MAGIC = b"CWB\x00"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHI")
+CROSSWORD_HEADER = struct.Struct("<HHBBHHH")
+ACROSTIC_SQUARE = struct.Struct("<HH")
+COUNT = struct.Struct("<I")
+CLUE_NUMBER = struct.Struct("<H")
+NONE_LENGTH = 0xffffffff
+
+CROSSWORD_KIND = 0
+ACROSTIC_KIND = 1
+PUNCTUATION_KIND = 0
+LETTER_KIND = 1
+
+SHOW_NOTE_ON_OPEN_FLAG = 0x01
+
+class RecordWriter(object):
+	def __init__(self):
+		self.__parts: list[bytes] = []
+
+	def write(self, data: bytes):
+		self.__parts.append(data)
+
+	def write_count(self, count: int):
+		self.write(COUNT.pack(count))
+
+	def write_string(self, string: str | None):
+		if string is None:
+			self.write_count(NONE_LENGTH)
+			return
+		data = string.encode("utf-8")
+		self.write_count(len(data))
+		self.write(data)
+
+	def write_text(self, text: crossword.FormattableText | None):
+		if text is None:
+			self.write_string(None)
+			return
+		self.write_string(text.text)
+		self.write_string(None if text.is_plain else text.html_string)
+
+	def write_array(self, values: array):
+		if sys.byteorder == "big" and values.itemsize > 1:
+			values = array(values.typecode, values)
+			values.byteswap()
+		self.write(values.tobytes())
+
+	def getvalue(self) -> bytes:
+		return b"".join(self.__parts)
+
+class RecordReader(object):
+	def __init__(self, data: memoryview, offset: int = 0):
+		self.__data = data
+		self.__offset = offset
+
+	@property
+	def offset(self):
+		return self.__offset
+
+	def read(self, length: int) -> memoryview:
+		start = self.__offset
+		if start + length > len(self.__data):
+			raise Exception("Unexpected end of record")
+		self.__offset = start + length
+		return self.__data[start:self.__offset]
+
+	def unpack(self, format: struct.Struct) -> tuple:
+		values = format.unpack_from(self.__data, self.__offset)
+		self.__offset += format.size
+		return values
+
+	def read_count(self) -> int:
+		return self.unpack(COUNT)[0]
+
+	def read_string(self) -> str | None:
+		length = self.read_count()
+		if length == NONE_LENGTH:
+			return None
+		return str(self.read(length), "utf-8")
+
+	def read_text(self) -> crossword.FormattableText | None:
+		text = self.read_string()
+		if text is None:
+			return None
+		return crossword.FormattableText(text, self.read_string())
+
+	def read_array(self, typecode: str, count: int) -> array:
+		values = array(typecode)
+		values.frombytes(self.read(count * values.itemsize))
+		if sys.byteorder == "big" and values.itemsize > 1:
+			values.byteswap()
+		return values
+
+def load_cwb(file: str | BinaryIO) -> crossword.Puzzle | acrostic.Acrostic:
+	return loads_cwb(files.read_file(file))
+
+def loads_cwb(data: Buffer, offset: int = 0) -> crossword.Puzzle | acrostic.Acrostic:
+	view = memoryview(data)
+	(magic, version, kind, _, length) = HEADER.unpack_from(view, offset)
+	if magic != MAGIC:
+		raise Exception("Not a CWB record")
+	if version != VERSION:
+		raise Exception(f"Unsupported CWB version {version}")
+	if offset + length > len(view):
+		raise Exception("Truncated CWB record")
+	reader = RecordReader(view[:offset + length], offset + HEADER.size)
+	if kind == CROSSWORD_KIND:
+		return read_crossword(reader)
+	elif kind == ACROSTIC_KIND:
+		return read_acrostic(reader)
+	raise Exception(f"Unknown CWB record kind {kind}")
+
+def record_length(data: Buffer, offset: int = 0) -> int:
+	(magic, _, _, _, length) = HEADER.unpack_from(data, offset)
+	if magic != MAGIC:
+		raise Exception("Not a CWB record")
+	return length
+
+def save_cwb(puzzle: crossword.Puzzle | acrostic.Acrostic, file: str | BinaryIO):
+	files.write_file(file, dumps_cwb(puzzle))
+
+def dumps_cwb(puzzle: crossword.Puzzle | acrostic.Acrostic) -> bytes:
+	writer = RecordWriter()
+	if isinstance(puzzle, crossword.Puzzle):
+		kind = CROSSWORD_KIND
+		write_crossword(puzzle, writer)
+	else:
+		kind = ACROSTIC_KIND
+		write_acrostic(puzzle, writer)
+	body = writer.getvalue()
+	return HEADER.pack(MAGIC, VERSION, kind, 0, HEADER.size + len(body)) + body
+
+def write_crossword(puzzle: crossword.Puzzle, writer: RecordWriter):
+	grid = (
+		puzzle.grid if isinstance(puzzle.grid, crossword.PackedGrid)
+		else crossword.PackedGrid.from_grid(puzzle.grid)
+	)
+	writer.write(CROSSWORD_HEADER.pack(
+		grid.rows,
+		grid.cols,
+		SHOW_NOTE_ON_OPEN_FLAG if puzzle.show_note_on_open else 0,
+		len(grid.palette) - 1,
+		len(grid.answers) - 1,
+		len(puzzle.across_clues),
+		len(puzzle.down_clues)
+	))
+	for color in grid.palette[1:]:
+		assert color is not None
+		writer.write(bytes(color.to_pixel()[:3]))
+	for answer in grid.answers[1:]:
+		writer.write_string(answer)
+	writer.write(bytes(grid.flags))
+	writer.write_array(grid.answer_indexes)
+	writer.write_array(grid.color_indexes)
+	for text in (puzzle.title, puzzle.author, puzzle.copyright, puzzle.note):
+		writer.write_text(text)
+	for clues in (puzzle.across_clues, puzzle.down_clues):
+		for (number, clue) in clues.items():
+			writer.write(CLUE_NUMBER.pack(number))
+			writer.write_text(clue)
+
+def read_crossword(reader: RecordReader) -> crossword.Puzzle:
+	(
+		rows, cols, flags, palette_size, answer_count, across_count, down_count
+	) = reader.unpack(CROSSWORD_HEADER)
+	palette: list[colors.Color | None] = [None]
+	for _ in range(palette_size):
+		(red, green, blue) = reader.read(3)
+		palette.append(colors.Color(red, green, blue))
+	answers: list[str | None] = [None]
+	for _ in range(answer_count):
+		answers.append(sys.intern(reader.read_string() or ""))
+	size = rows * cols
+	grid = crossword.PackedGrid.from_packed(
+		rows,
+		cols,
+		bytearray(reader.read(size)),
+		answers,
+		reader.read_array("H", size),
+		palette,
+		reader.read_array("B", size)
+	)
+	(title, author, copyright, note) = (reader.read_text() for _ in range(4))
+	across = read_clues(reader, across_count)
+	down = read_clues(reader, down_count)
+	return crossword.Puzzle(
+		grid=grid,
+		across=across,
+		down=down,
+		title=title,
+		author=author,
+		copyright=copyright,
+		note=note,
+		show_note_on_open=bool(flags & SHOW_NOTE_ON_OPEN_FLAG)
+	)
+
+def read_clues(reader: RecordReader, count: int) -> dict[int, crossword.FormattableText]:
+	clues: dict[int, crossword.FormattableText] = {}
+	for _ in range(count):
+		[number] = reader.unpack(CLUE_NUMBER)
+		clue = reader.read_text()
+		if clue is None:
+			raise Exception(f"Missing text for clue {number}")
+		clues[number] = clue
+	return clues
+
+def write_acrostic(puzzle: acrostic.Acrostic, writer: RecordWriter):
+	writer.write_count(len(puzzle.squares))
+	for square in puzzle.squares:
+		if isinstance(square, acrostic.LetterSquare):
+			writer.write(bytes([LETTER_KIND]))
+			writer.write(ACROSTIC_SQUARE.pack(square.clue_index, square.clue_word_index))
+		else:
+			writer.write(bytes([PUNCTUATION_KIND]))
+		writer.write_string(square.letter())
+	writer.write_count(len(puzzle.clues))
+	for clue in puzzle.clues:
+		writer.write_string(clue)
+	for string in (
+		puzzle.quote_text, puzzle.quote_author, puzzle.quote_work,
+		puzzle.title, puzzle.author, puzzle.copyright
+	):
+		writer.write_string(string)
+
+def read_acrostic(reader: RecordReader) -> acrostic.Acrostic:
+	squares: list[acrostic.AcrosticSquare] = []
+	for _ in range(reader.read_count()):
+		[kind] = reader.read(1)
+		if kind == LETTER_KIND:
+			(clue_index, clue_word_index) = reader.unpack(ACROSTIC_SQUARE)
+			squares.append(acrostic.LetterSquare(reader.read_string() or "", clue_index, clue_word_index))
+		elif kind == PUNCTUATION_KIND:
+			squares.append(acrostic.PunctuationSquare(reader.read_string() or ""))
+		else:
+			raise Exception(f"Unknown acrostic square kind {kind}")
+	clues = [reader.read_string() or "" for _ in range(reader.read_count())]
+	(quote_text, quote_author, quote_work, title, author, copyright) = (
+		reader.read_string() or "" for _ in range(6)
+	)
+	return acrostic.Acrostic(
+		squares, clues,
+		quote_text, quote_author, quote_work,
+		title, author, copyright
+	)
\ No newline at end of file
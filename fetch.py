@@ -0,0 +1,350 @@
+import contextlib
+import contextvars
+import datetime
+import hashlib
+import json
+import math
+import os
+import sys
+import threading
+import time
+import urllib.parse
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from typing import Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+	import requests
+
+LISTING_TTL = 60 * 60
+CURRENT_TTL = 60 * 60
+FOREVER = math.inf
+PRIVATE_HEADERS = frozenset(["set-cookie", "set-cookie2"])
+
+refresh = contextvars.ContextVar("refresh", default=False)
+
+def date_ttl(date: datetime.date) -> float:
+	return FOREVER if date < datetime.date.today() else CURRENT_TTL
+
+@contextlib.contextmanager
+def refreshing(enabled: bool = True) -> Iterator[None]:
+	token = refresh.set(enabled)
+	try:
+		yield
+	finally:
+		refresh.reset(token)
+
+class CachedResponse(object):
+	def __init__(self, url: str, status_code: int, headers: dict[str, str], content: bytes):
+		self.__url = url
+		self.__status_code = status_code
+		self.__headers = headers
+		self.__content = content
+
+	@property
+	def url(self):
+		return self.__url
+
+	@property
+	def status_code(self):
+		return self.__status_code
+
+	@property
+	def headers(self):
+		return self.__headers
+
+	@property
+	def content(self):
+		return self.__content
+
+	@staticmethod
+	def from_response(response: requests.Response) -> CachedResponse:
+		return CachedResponse(
+			response.url,
+			response.status_code,
+			dict(response.headers),
+			response.content
+		)
+
+	def to_response(self) -> requests.Response:
+		import requests
+		import requests.structures
+		import requests.utils
+		response = requests.Response()
+		response.url = self.url
+		response.status_code = self.status_code
+		response.headers = requests.structures.CaseInsensitiveDict(self.headers)
+		response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+		response._content = self.content # type: ignore
+		return response
+
+class Cache(ABC):
+	@abstractmethod
+	def get(self, key: str) -> CachedResponse | None: ...
+
+	@abstractmethod
+	def put(self, key: str, response: CachedResponse, ttl: float): ...
+
+class DiskCache(Cache):
+	def __init__(self, directory: str, max_bytes: int = 1 << 30):
+		self.__directory = directory
+		self.__max_bytes = max_bytes
+		self.__lock = threading.Lock()
+		os.makedirs(directory, exist_ok=True)
+		self.__size = sum(
+			os.path.getsize(os.path.join(directory, name))
+			for name in os.listdir(directory)
+		)
+
+	def __path(self, key: str) -> str:
+		return os.path.join(self.__directory, key)
+
+	def __read(self, path: str) -> tuple[CachedResponse, float | None] | None:
+		try:
+			with open(path, "rb") as reader:
+				data = reader.read()
+		except FileNotFoundError:
+			return None
+		(header, content) = data.split(b"\n", 1)
+		metadata = json.loads(header)
+		return (
+			CachedResponse(
+				metadata["url"],
+				metadata["status_code"],
+				metadata["headers"],
+				content
+			),
+			metadata["expires"]
+		)
+
+	def get(self, key: str) -> CachedResponse | None:
+		path = self.__path(key)
+		if (entry := self.__read(path)) is None:
+			return None
+		(response, expires) = entry
+		if is_expired(expires):
+			with self.__lock:
+				self.__remove(path)
+			return None
+		try:
+			os.utime(path)
+		except FileNotFoundError:
+			pass
+		return response
+
+	def items(self) -> Iterator[tuple[str, CachedResponse]]:
+		for name in os.listdir(self.__directory):
+			if name.endswith(".tmp"):
+				continue
+			entry = self.__read(self.__path(name))
+			if entry is not None and not is_expired(entry[1]):
+				yield (name, entry[0])
+
+	def put(self, key: str, response: CachedResponse, ttl: float):
+		data = json.dumps({
+			"url": response.url,
+			"status_code": response.status_code,
+			"headers": {
+				name: value for (name, value) in response.headers.items()
+				if name.lower() not in PRIVATE_HEADERS
+			},
+			"expires": time.time() + ttl if ttl != FOREVER else None
+		}).encode("utf-8") + b"\n" + response.content
+		path = self.__path(key)
+		with self.__lock:
+			if os.path.exists(path):
+				self.__size -= os.path.getsize(path)
+			temp_path = f"{path}.{threading.get_ident()}.tmp"
+			with open(temp_path, "wb") as writer:
+				writer.write(data)
+			os.replace(temp_path, path)
+			self.__size += len(data)
+			if self.__size > self.__max_bytes:
+				self.__evict()
+
+	def __evict(self):
+		paths = [
+			self.__path(name) for name in os.listdir(self.__directory)
+			if not name.endswith(".tmp")
+		]
+		for path in paths:
+			with open(path, "rb") as reader:
+				expires = json.loads(reader.readline())["expires"]
+			if is_expired(expires):
+				self.__remove(path)
+		entries = sorted(
+			(os.stat(path).st_mtime, path)
+			for path in paths if os.path.exists(path)
+		)
+		for (_, path) in entries:
+			if self.__size <= self.__max_bytes:
+				break
+			self.__remove(path)
+
+	def __remove(self, path: str):
+		try:
+			size = os.path.getsize(path)
+			os.remove(path)
+		except FileNotFoundError:
+			return
+		self.__size -= size
+
+def is_expired(expires: float | None) -> bool:
+	return expires is not None and expires < time.time()
+
+class MissingFixture(Exception):
+	def __init__(self, url: str, key: str):
+		super().__init__(f"No recorded response for {url} (fixture {key})")
+		self.__url = url
+		self.__key = key
+
+	@property
+	def url(self):
+		return self.__url
+
+	@property
+	def key(self):
+		return self.__key
+
+class Fixtures(object):
+	def __init__(self, store: Cache, replaying: bool = False, latency: float = 0):
+		self.__store = store
+		self.__replaying = replaying
+		self.__latency = latency
+
+	@property
+	def store(self):
+		return self.__store
+
+	@property
+	def replaying(self):
+		return self.__replaying
+
+	@property
+	def latency(self):
+		return self.__latency
+
+	def record(self, key: str, response: requests.Response):
+		self.__store.put(key, CachedResponse.from_response(response), FOREVER)
+
+	def replay(self, url: str, key: str) -> requests.Response:
+		recorded = self.__store.get(key)
+		if recorded is None:
+			raise MissingFixture(url, key)
+		if self.__latency > 0:
+			time.sleep(self.__latency)
+		return recorded.to_response()
+
+def fixture_store(directory: str) -> DiskCache:
+	return DiskCache(directory, max_bytes=sys.maxsize)
+
+def cache_key(
+	url: str,
+	params: dict[str, Any] | None,
+	headers: dict[str, Any] | None,
+	cookies: dict[str, str] | None
+) -> str:
+	return hashlib.sha256(json.dumps([
+		url,
+		sorted((key, value) for (key, value) in (params or {}).items() if value is not None),
+		sorted((headers or {}).items()),
+		sorted((cookies or {}).items())
+	]).encode("utf-8")).hexdigest()
+
+class RateLimiter(object):
+	def __init__(self, requests_per_second: float | None = None):
+		self.__interval = 1 / requests_per_second if requests_per_second else 0
+		self.__next_slot: dict[str, float] = {}
+		self.__lock = threading.Lock()
+
+	def wait(self, host: str):
+		if self.__interval == 0:
+			return
+		with self.__lock:
+			now = time.monotonic()
+			slot = max(now, self.__next_slot.get(host, now))
+			self.__next_slot[host] = slot + self.__interval
+		if slot > now:
+			time.sleep(slot - now)
+
+class Fetcher(object):
+	def __init__(
+		self,
+		pool_size: int = 10,
+		requests_per_second: float | None = None,
+		cache: Cache | None = None,
+		fixtures: Fixtures | None = None
+	):
+		self.__cache = cache
+		self.__fixtures = fixtures
+		self.__pool_size = pool_size
+		self.__session: requests.Session | None = None
+		self.__session_lock = threading.Lock()
+		self.__limiter = RateLimiter(requests_per_second)
+
+	@property
+	def cache(self):
+		return self.__cache
+
+	@property
+	def fixtures(self):
+		return self.__fixtures
+
+	def get(
+		self,
+		url: str,
+		params: dict[str, Any] | None = None,
+		headers: dict[str, Any] | None = None,
+		cookies: dict[str, str] | None = None,
+		ttl: float = 0
+	) -> requests.Response:
+		key = cache_key(url, params, headers, cookies)
+		if self.__cache is not None and ttl > 0 and not refresh.get():
+			cached = self.__cache.get(key)
+			if cached is not None:
+				return cached.to_response()
+		if self.__fixtures is not None and self.__fixtures.replaying:
+			response = self.__fixtures.replay(url, key)
+		else:
+			self.__limiter.wait(urllib.parse.urlsplit(url).netloc)
+			response = self.__get_session().get(url, params=params, headers=headers, cookies=cookies)
+			if self.__fixtures is not None:
+				self.__fixtures.record(key, response)
+		if self.__cache is not None and ttl > 0 and response.status_code == 200:
+			self.__cache.put(key, CachedResponse.from_response(response), ttl)
+		return response
+
+	def __get_session(self) -> requests.Session:
+		with self.__session_lock:
+			if self.__session is None:
+				import requests
+				import requests.adapters
+				session = requests.Session()
+				adapter = requests.adapters.HTTPAdapter(
+					pool_connections=self.__pool_size,
+					pool_maxsize=self.__pool_size
+				)
+				session.mount("http://", adapter)
+				session.mount("https://", adapter)
+				self.__session = session
+			return self.__session
+
+fetcher = Fetcher()
+
+def configure(
+	pool_size: int = 10,
+	requests_per_second: float | None = None,
+	cache: Cache | None = None,
+	fixtures: Fixtures | None = None
+):
+	global fetcher
+	fetcher = Fetcher(pool_size, requests_per_second, cache, fixtures)
+
+def get(
+	url: str,
+	params: dict[str, Any] | None = None,
+	headers: dict[str, Any] | None = None,
+	cookies: dict[str, str] | None = None,
+	ttl: float = 0
+) -> requests.Response:
+	return fetcher.get(url, params=params, headers=headers, cookies=cookies, ttl=ttl)
\ No newline at end of file
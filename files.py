@@ -0,0 +1,50 @@
+import contextlib
+import io
+from collections.abc import Iterator
+from typing import BinaryIO, TextIO
+
+def read_file(file: str | BinaryIO) -> bytes:
+	if isinstance(file, str):
+		with open(file, "rb") as reader:
+			return reader.read()
+	return file.read()
+
+def write_file(file: str | BinaryIO, data: bytes):
+	if isinstance(file, str):
+		with open(file, "wb") as writer:
+			writer.write(data)
+	else:
+		file.write(data)
+
+@contextlib.contextmanager
+def binary_writer(file: str | BinaryIO) -> Iterator[BinaryIO]:
+	if isinstance(file, str):
+		with open(file, "wb") as writer:
+			yield writer
+	else:
+		yield file
+
+@contextlib.contextmanager
+def text_reader(file: str | BinaryIO) -> Iterator[TextIO]:
+	if isinstance(file, str):
+		with open(file, encoding="utf-8") as reader:
+			yield reader
+	else:
+		reader = io.TextIOWrapper(file, encoding="utf-8")
+		try:
+			yield reader
+		finally:
+			reader.detach()
+
+@contextlib.contextmanager
+def text_writer(file: str | BinaryIO) -> Iterator[TextIO]:
+	if isinstance(file, str):
+		with open(file, "w", encoding="utf-8", newline="") as writer:
+			yield writer
+	else:
+		writer = io.TextIOWrapper(file, encoding="utf-8", newline="")
+		try:
+			yield writer
+		finally:
+			writer.flush()
+			writer.detach()
\ No newline at end of file
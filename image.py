@@ -1,126 +1,205 @@
 from PIL import Image, ImageDraw, ImageFont
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import BinaryIO
 import crossword
-import re
+import functools
+from colors import Color
+from layout import SIZE_FACTOR, square_color, border_line
 
 Pixel = tuple[int, int, int, int]
 
-class Color(object):
-	def __init__(self, red: int, green: int, blue: int):
-		self.__red = red
-		self.__green = green
-		self.__blue = blue
-	
-	def to_pixel(self):
-		return (self.__red, self.__green, self.__blue, 0xff)
+SCALE = 2
+FONT_NAME = "arial.ttf"
 
-	def __str__(self):
-		return f"({self.__red}, {self.__green}, {self.__blue})"
+@functools.cache
+def load_font(name: str, size: int) -> ImageFont.FreeTypeFont:
+	return ImageFont.truetype(name, size)
 
-	def hex(self):
-		return f"#{self.__red:0>2x}{self.__green:0>2x}{self.__blue:0>2x}"
-	
-	@staticmethod
-	def from_hex(hex: str) -> Color:
-		match = Color.__color_expr.match(hex)
-		if match is None:
-			raise ValueError(f"Invalid color: {hex}")
-		(red, green, blue) = match.groups()
-		return Color(
-			int(red, 16),
-			int(green ,16),
-			int(blue, 16)
-		)
-
-	__color_expr = re.compile(r"#([\da-f]{2})([\da-f]{2})([\da-f]{2})", re.I)
-
-	Black: Color
-	White: Color
-	Gray: Color
-
-Color.Black = Color(0x00, 0x00, 0x00)
-Color.White = Color(0xff, 0xff, 0xff)
-Color.Gray = Color(0x80, 0x80, 0x80)
-
-def square_color(square: crossword.Square) -> Color:
+@functools.lru_cache(maxsize=4096)
+def answer_font(answer: str, size: int) -> ImageFont.FreeTypeFont:
+	font = load_font(FONT_NAME, int(size * SIZE_FACTOR))
+	text_width = font.getlength(answer)
 	return (
-		(square.color or Color.White) if isinstance(square, crossword.WhiteSquare)
-		else Color.Black
+		font if text_width <= size * SIZE_FACTOR
+		else load_font(FONT_NAME, int((size * SIZE_FACTOR) ** 2 / text_width))
 	)
 
-def draw_grid(
-	grid: crossword.Grid,
-	file_path: str,
-	size: int = 60
+@functools.lru_cache(maxsize=1024)
+def square_tile(
+	fill: Pixel,
+	is_circled: bool,
+	answer: str | None,
+	size: int,
+	supersample: bool
+) -> Image.Image:
+	scale = SCALE if supersample else 1
+	scaled_size = size * scale
+	tile = Image.new("RGBA", (scaled_size + scale, scaled_size + scale))
+	draw = ImageDraw.Draw(tile)
+	xy = ((0, 0), (scaled_size, scaled_size))
+	draw.rectangle(
+		xy=xy,
+		outline=Color.Gray.to_pixel(),
+		fill=fill,
+		width=scale
+	)
+	if is_circled:
+		draw.ellipse(
+			xy=xy,
+			outline=Color.Black.to_pixel(),
+			width=scale
+		)
+	if answer is not None:
+		draw.text(
+			xy=(scaled_size / 2, scaled_size / 2),
+			text=answer,
+			fill=Color.Black.to_pixel(),
+			font=answer_font(answer, scaled_size),
+			anchor="mm"
+		)
+	return tile.resize((size + 1, size + 1)) if supersample else tile
+
+def render_grid(
+	grid: crossword.BaseGrid,
+	size: int = 60,
+	supersample: bool = True,
+	show_answers: bool = True,
+	border: bool = False
+) -> Image.Image:
+	edge = 1 if border else 0
+	image = Image.new("RGBA", (size * grid.cols + edge, size * grid.rows + edge))
+	paste_grid(image, grid, (0, 0), size, supersample, show_answers)
+	return image
+
+def paste_grid(
+	image: Image.Image,
+	grid: crossword.BaseGrid,
+	origin: tuple[int, int],
+	size: int = 60,
+	supersample: bool = True,
+	show_answers: bool = True
 ):
-	SCALE = 2
-	SIZE_FACTOR = 0.8
-	size *= SCALE
-	FONT_NAME = "arial.ttf"
-	width = size * grid.cols + 1
-	height = size * grid.rows + 1
-	image = Image.new("RGBA", (width, height))
-	draw = ImageDraw.Draw(image)
-	font = ImageFont.truetype(FONT_NAME, int(size * SIZE_FACTOR))
+	(left, top) = origin
 	bars: list[tuple[tuple[float, float], tuple[float,float]]] = []
 	for ((row, col), square) in grid:
-		xy = (
-			(col * size, row * size),
-			((col + 1) * size, (row + 1) * size)
-		)
-		draw.rectangle(
-			xy=xy,
-			outline=Color.Gray.to_pixel(),
-			fill=square_color(square).to_pixel(),
-			width=SCALE
-		)
-		if isinstance(square, crossword.WhiteSquare) and square.is_circled:
-			draw.ellipse(
-				xy=xy,
-				outline=Color.Black.to_pixel(),
-				width=SCALE
-			)
+		(x, y) = (left + col * size, top + row * size)
 		if isinstance(square, crossword.WhiteSquare):
-			if square.answer is not None:
-				text_width = font.getlength(square.answer)
-				draw.text(
-					xy=(
-						col * size + (size / 2),
-						row * size + (size / 2)
-					),
-					text=square.answer,
-					fill = Color.Black.to_pixel(),
-					font = (
-						font if text_width <= size * SIZE_FACTOR
-						else ImageFont.truetype(
-							FONT_NAME, int((size * SIZE_FACTOR) ** 2 / text_width)
-						)
-					),
-					anchor = "mm"
-				)
+			tile = square_tile(
+				square_color(square).to_pixel(),
+				square.is_circled,
+				square.answer if show_answers else None,
+				size,
+				supersample
+			)
+			xy = ((x, y), (x + size, y + size))
 			for side in crossword.SquareSide:
 				if square.has_bar(side):
 					bars.append(border_line(xy, side))
-
+		else:
+			tile = square_tile(Color.Black.to_pixel(), False, None, size, supersample)
+		image.paste(tile, (x, y))
+	draw = ImageDraw.Draw(image)
 	for xy in bars:
 		draw.line(
 			xy,
 			fill=Color.Black.to_pixel(),
-			width=4 * SCALE
+			width=max(1, size // 15)
 		)
-	x = image.resize((width // SCALE, height // SCALE)) # type: ignore
-	x.save(file_path, "PNG")
 
-def border_line(
-	corners_xy: tuple[tuple[float, float], tuple[float,float]],
-	side: crossword.SquareSide
-) -> tuple[tuple[float, float], tuple[float, float]]:
-	((x1, y1), (x2, y2)) = corners_xy
-	match side:
-		case crossword.SquareSide.TOP:
-			return ((x1, y1), (x2, y1))
-		case crossword.SquareSide.RIGHT:
-			return ((x2, y1), (x2, y2))
-		case crossword.SquareSide.BOTTOM:
-			return ((x1, y2), (x2, y2))
-		case crossword.SquareSide.LEFT:
-			return ((x1, y1), (x1, y2))
\ No newline at end of file
+def draw_grid(
+	grid: crossword.BaseGrid,
+	file: str | BinaryIO,
+	size: int = 60,
+	supersample: bool = True
+):
+	render_grid(grid, size, supersample).save(file, "PNG")
+
+def save_image(image: Image.Image, file: str | BinaryIO, format: str = "PNG"):
+	if format.upper() == "WEBP":
+		image.save(file, "WEBP", lossless=True)
+	else:
+		image.save(file, format)
+
+def render_grids(
+	grids: list[crossword.BaseGrid],
+	size: int,
+	supersample: bool,
+	show_answers: bool,
+	workers: int | None,
+	border: bool = False
+) -> Iterator[Image.Image]:
+	if workers == 1:
+		for grid in grids:
+			yield render_grid(grid, size, supersample, show_answers, border)
+		return
+	with ProcessPoolExecutor(max_workers=workers) as executor:
+		yield from executor.map(
+			functools.partial(render_grid, size=size, supersample=supersample, show_answers=show_answers, border=border),
+			grids,
+			chunksize=16
+		)
+
+def sprite_sheet(
+	grids: list[crossword.BaseGrid],
+	size: int = 10,
+	columns: int = 20,
+	padding: int = 4,
+	supersample: bool = False,
+	show_answers: bool = False,
+	workers: int | None = 1
+) -> tuple[Image.Image, list[tuple[int, int, int, int]]]:
+	if len(grids) == 0:
+		raise ValueError("A sprite sheet needs at least one grid")
+	slot_width = max(grid.cols for grid in grids) * size + padding
+	slot_height = max(grid.rows for grid in grids) * size + padding
+	rows = (len(grids) - 1) // columns + 1
+	sheet = Image.new("RGBA", (
+		slot_width * min(columns, len(grids)) - padding,
+		slot_height * rows - padding
+	))
+	boxes: list[tuple[int, int, int, int]] = []
+	for (index, grid) in enumerate(grids):
+		(x, y) = ((index % columns) * slot_width, (index // columns) * slot_height)
+		boxes.append((x, y, x + grid.cols * size, y + grid.rows * size))
+	for (thumbnail, (x, y, _, _)) in zip(
+		render_grids(grids, size, supersample, show_answers, workers, border=True),
+		boxes
+	):
+		sheet.paste(thumbnail, (x, y))
+	return (sheet, boxes)
+
+def save_sprite_sheet(
+	grids: list[crossword.BaseGrid],
+	file: str | BinaryIO,
+	format: str = "PNG",
+	size: int = 10,
+	columns: int = 20,
+	padding: int = 4,
+	supersample: bool = False,
+	show_answers: bool = False,
+	workers: int | None = 1
+) -> list[tuple[int, int, int, int]]:
+	(sheet, boxes) = sprite_sheet(grids, size, columns, padding, supersample, show_answers, workers)
+	save_image(sheet, file, format)
+	return boxes
+
+def save_thumbnails(
+	thumbnails: list[tuple[crossword.BaseGrid, str | BinaryIO]],
+	format: str = "PNG",
+	size: int = 10,
+	supersample: bool = False,
+	show_answers: bool = False,
+	workers: int | None = 1
+):
+	for (image, (_, file)) in zip(
+		render_grids([grid for (grid, _) in thumbnails], size, supersample, show_answers, workers),
+		thumbnails
+	):
+		save_image(image, file, format)
+
+def dumps_png(grid: crossword.BaseGrid, size: int = 60, supersample: bool = True) -> bytes:
+	buffer = BytesIO()
+	draw_grid(grid, buffer, size, supersample)
+	return buffer.getvalue()
\ No newline at end of file
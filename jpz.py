@@ -1,112 +1,156 @@
 import xml.etree.ElementTree as ET
+from io import BytesIO, TextIOWrapper
+from typing import BinaryIO
 import crossword
 import acrostic
+import files
+import colors
 import string
 
 NUM_COLS = 3
 GRID_WORD_ID = "1000"
 ATTRIB_WORD_ID = "1001"
 
-def element_with_raw_html(tag: str, text: crossword.FormattableText):
-	xml_ish = f"<{tag}>{text.html}</{tag}>"
-	return ET.fromstring(xml_ish)
+class XmlWriter(object):
+	def __init__(self, stream: BinaryIO):
+		self.__writer = TextIOWrapper(stream, encoding="utf-8", newline="")
+		self.__writer.write("<?xml version='1.0' encoding='utf-8'?>\n")
 
-def clue_element(clue: crossword.FormattableText, word_id: int, clue_number: int):
-	element = element_with_raw_html("clue", clue)
-	element.attrib = {
-		"word": str(word_id),
-		"number": str(clue_number)
-	}
-	return element
+	def __enter__(self) -> XmlWriter:
+		return self
 
-def save_crossword_jpz(puzzle: crossword.Puzzle, file_path: str):
-	root = ET.Element("crossword-compiler-applet", {
-		"xmlns": "http://crossword.info/xml/crossword-compiler"
-	})
-	puzzle_el = ET.SubElement(root, "rectangular-puzzle", {
-		"xmlns": "http://crossword.info/xml/rectangular-puzzle",
-		"alphabet": "ABCDEFGHIJIKLMNOPQRSTUVWXYZ"
-	})
-	metadata = ET.SubElement(puzzle_el, "metadata")
-	note_key = (
-		"description" if puzzle.show_note_on_open
-		else "instructions"
+	def __exit__(self, *_):
+		self.close()
+
+	def start(self, tag: str, attrib: dict[str, str] | None = None):
+		self.__writer.write(f"<{tag}{attributes(attrib)}>")
+
+	def end(self, tag: str):
+		self.__writer.write(f"</{tag}>")
+
+	def empty(self, tag: str, attrib: dict[str, str] | None = None):
+		self.__writer.write(f"<{tag}{attributes(attrib)} />")
+
+	def text(self, tag: str, text: str, attrib: dict[str, str] | None = None):
+		self.__writer.write(f"<{tag}{attributes(attrib)}>{escape_text(text)}</{tag}>")
+
+	def html(self, tag: str, text: crossword.FormattableText, attrib: dict[str, str] | None = None):
+		self.__writer.write(f"<{tag}{attributes(attrib)}>{text.html_string}</{tag}>")
+
+	def close(self):
+		try:
+			self.__writer.flush()
+		finally:
+			self.__writer.detach()
+
+def escape_text(text: str) -> str:
+	return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+def attributes(attrib: dict[str, str] | None) -> str:
+	if attrib is None:
+		return ""
+	return "".join(
+		f" {key}=\"{
+			escape_text(value)
+				.replace("\"", "&quot;")
+				.replace("\r", "&#13;")
+				.replace("\n", "&#10;")
+				.replace("\t", "&#09;")
+		}\""
+		for (key, value) in attrib.items()
 	)
-	for (tag, text) in [
-		("title", puzzle.title),
-		("creator", puzzle.author),
-		("copyright", puzzle.copyright),
-		(note_key, puzzle.note)
-	]:
-		if text is not None:
-			metadata.append(element_with_raw_html(tag, text))
-	
-	crossword_el = ET.SubElement(puzzle_el, "crossword")
-	grid = ET.SubElement(crossword_el, "grid", {
-		"width": str(puzzle.grid.cols),
-		"height": str(puzzle.grid.rows)
-	})
-	ET.SubElement(grid, "grid-look", {
-		"hide-lines": "true"
-	})
-	word_count = 0
-	clue_count = 0
-	across_clues = ET.Element("clues", {
-		"ordering": "normal"
-	})
-	ET.SubElement(across_clues, "title").text = "Across"
-	down_clues = ET.Element("clues", {
-		"ordering": "normal"
-	})
-	ET.SubElement(down_clues, "title").text = "Down"
-	for ((row, col), square) in puzzle.grid:
-		cell = ET.SubElement(grid, "cell", {
-			"x": str(col + 1),
-			"y": str(row + 1)
-		})
-		if isinstance(square, crossword.WhiteSquare):
-			if square.answer is not None:
-				cell.attrib["solution"] = square.answer
-			if square.is_circled:
-				cell.attrib["background-shape"] = "circle"
-			if square.color:
-				cell.attrib["background-color"] = square.color.hex()
-			for side in crossword.SquareSide:
-				if square.has_bar(side):
-					cell.attrib[bar_attribute(side)] = "true"
-		else:
-			cell.attrib["type"] = "block"
-		is_across = puzzle.grid.is_across_start(row, col)
-		is_down = puzzle.grid.is_down_start(row, col)
-		if is_across or is_down:
-			clue_count += 1
-			cell.attrib["number"] = str(clue_count)
-			if is_across:
-				word_count += 1
-				word = ET.SubElement(crossword_el, "word", {
-					"id": str(word_count)
+
+def save_crossword_jpz(puzzle: crossword.Puzzle, file: str | BinaryIO):
+	with files.binary_writer(file) as stream:
+		with XmlWriter(stream) as writer:
+			writer.start("crossword-compiler-applet", {
+				"xmlns": "http://crossword.info/xml/crossword-compiler"
+			})
+			writer.start("rectangular-puzzle", {
+				"xmlns": "http://crossword.info/xml/rectangular-puzzle",
+				"alphabet": "ABCDEFGHIJIKLMNOPQRSTUVWXYZ"
+			})
+			writer.start("metadata")
+			note_key = (
+				"description" if puzzle.show_note_on_open
+				else "instructions"
+			)
+			for (tag, text) in [
+				("title", puzzle.title),
+				("creator", puzzle.author),
+				("copyright", puzzle.copyright),
+				(note_key, puzzle.note)
+			]:
+				if text is not None:
+					writer.html(tag, text)
+			writer.end("metadata")
+
+			writer.start("crossword")
+			writer.start("grid", {
+				"width": str(puzzle.grid.cols),
+				"height": str(puzzle.grid.rows)
+			})
+			writer.empty("grid-look", {
+				"hide-lines": "true"
+			})
+			numbering = puzzle.grid.numbering
+			for ((row, col), square) in puzzle.grid:
+				cell = {
+					"x": str(col + 1),
+					"y": str(row + 1)
+				}
+				if isinstance(square, crossword.WhiteSquare):
+					if square.answer is not None:
+						cell["solution"] = square.answer
+					if square.is_circled:
+						cell["background-shape"] = "circle"
+					if square.color:
+						cell["background-color"] = square.color.hex()
+					for side in crossword.SquareSide:
+						if square.has_bar(side):
+							cell[bar_attribute(side)] = "true"
+				else:
+					cell["type"] = "block"
+				number = numbering.number_at(row, col)
+				if number is not None:
+					cell["number"] = str(number)
+				writer.empty("cell", cell)
+			writer.end("grid")
+
+			word_ids: dict[tuple[crossword.Direction, int], int] = {}
+			for (word_id, word) in enumerate(numbering.words, 1):
+				word_ids[word.direction, word.number] = word_id
+				writer.start("word", {
+					"id": str(word_id)
 				})
-				for acr_col in puzzle.grid.across_word_cols(row, col):
-					ET.SubElement(word, "cells", {
-						"x": str(acr_col + 1),
+				for (row, col) in word.cells:
+					writer.empty("cells", {
+						"x": str(col + 1),
 						"y": str(row + 1)
 					})
-				across_clues.append(clue_element(puzzle.across_clues[clue_count], word_count, clue_count))
-			if is_down:
-				word_count += 1
-				word = ET.SubElement(crossword_el, "word", {
-					"id": str(word_count)
+				writer.end("word")
+			for (title, words) in [
+				("Across", numbering.across),
+				("Down", numbering.down)
+			]:
+				writer.start("clues", {
+					"ordering": "normal"
 				})
-				down_row = row
-				for down_row in puzzle.grid.down_word_rows(row, col):
-					ET.SubElement(word, "cells", {
-						"x": str(col + 1),
-						"y": str(down_row + 1)
+				writer.text("title", title)
+				for word in words:
+					writer.html("clue", puzzle.clue(word), {
+						"word": str(word_ids[word.direction, word.number]),
+						"number": str(word.number)
 					})
-				down_clues.append(clue_element(puzzle.down_clues[clue_count], word_count, clue_count))
-	crossword_el.append(across_clues)
-	crossword_el.append(down_clues)
-	ET.ElementTree(root).write(file_path, xml_declaration=True, encoding="utf-8")
+				writer.end("clues")
+			writer.end("crossword")
+			writer.end("rectangular-puzzle")
+			writer.end("crossword-compiler-applet")
+
+def dumps_crossword_jpz(puzzle: crossword.Puzzle) -> bytes:
+	buffer = BytesIO()
+	save_crossword_jpz(puzzle, buffer)
+	return buffer.getvalue()
 
 def bar_attribute(side: crossword.SquareSide) -> str:
 	match side:
@@ -119,7 +163,7 @@ def bar_attribute(side: crossword.SquareSide) -> str:
 		case crossword.SquareSide.LEFT:
 			return "left-bar"
 
-def save_acrostic_jpz(puzzle: acrostic.Acrostic, file_path: str):
+def save_acrostic_jpz(puzzle: acrostic.Acrostic, file: str | BinaryIO):
 	root = ET.Element("crossword-compiler-applet", {
 		"xmlns": "http://crossword.info/xml/crossword-compiler"
 	})
@@ -261,4 +305,243 @@ def save_acrostic_jpz(puzzle: acrostic.Acrostic, file_path: str):
 		"number": ""
 	}).text = "[Author and title]"
 	acrostic_el.append(clues_el)
-	ET.ElementTree(root).write(file_path, xml_declaration=True, encoding="utf-8")
\ No newline at end of file
+	ET.ElementTree(root).write(file, xml_declaration=True, encoding="utf-8")
+
+def dumps_acrostic_jpz(puzzle: acrostic.Acrostic) -> bytes:
+	buffer = BytesIO()
+	save_acrostic_jpz(puzzle, buffer)
+	return buffer.getvalue()
+
+def load_jpz(file: str | BinaryIO) -> crossword.Puzzle | acrostic.Acrostic:
+	reader = JpzReader()
+	for (event, element) in ET.iterparse(file, events=("start", "end")):
+		reader.handle(event, element)
+	return reader.result()
+
+def loads_jpz(data: bytes) -> crossword.Puzzle | acrostic.Acrostic:
+	return load_jpz(BytesIO(data))
+
+def local_name(tag: str) -> str:
+	return tag[tag.index("}") + 1:] if tag.startswith("{") else tag
+
+class JpzReader(object):
+	def __init__(self):
+		self.__kind: str | None = None
+		self.__metadata: dict[str, ET.Element] = {}
+		self.__completion: str | None = None
+		self.__width = 0
+		self.__height = 0
+		self.__cells: dict[tuple[int, int], dict[str, str]] = {}
+		self.__words: dict[str, list[tuple[int, int]]] = {}
+		self.__clue_lists: list[tuple[str, list[tuple[str, str, ET.Element]]]] = []
+		self.__path: list[tuple[str, ET.Element]] = []
+
+	def handle(self, event: str, element: ET.Element):
+		tag = local_name(element.tag)
+		if event == "start":
+			self.__path.append((tag, element))
+			if tag in ("crossword", "acrostic") and self.__kind is None:
+				self.__kind = tag
+			elif tag == "grid":
+				self.__width = int(element.attrib["width"])
+				self.__height = int(element.attrib["height"])
+			elif tag == "clues":
+				self.__clue_lists.append(("", []))
+			return
+		self.__path.pop()
+		(parent, parent_element) = self.__path[-1] if len(self.__path) > 0 else (None, None)
+		if tag == "cell" and parent == "grid":
+			self.__cells[int(element.attrib["x"]) - 1, int(element.attrib["y"]) - 1] = dict(element.attrib)
+			if parent_element is not None:
+				parent_element.remove(element)
+		elif tag == "cells" and parent == "word":
+			return
+		elif tag == "word":
+			self.__words[element.attrib["id"]] = [
+				(int(cell.attrib["x"]) - 1, int(cell.attrib["y"]) - 1)
+				for cell in element
+			]
+			if parent_element is not None:
+				parent_element.remove(element)
+		elif tag == "title" and parent == "clues":
+			(_, clues) = self.__clue_lists[-1]
+			self.__clue_lists[-1] = ("".join(element.itertext()), clues)
+		elif tag == "clue" and parent == "clues":
+			self.__clue_lists[-1][1].append((
+				element.attrib.get("word", ""),
+				element.attrib.get("number", ""),
+				element
+			))
+		elif parent == "metadata":
+			self.__metadata[tag] = element
+		elif tag == "completion":
+			self.__completion = element.text or ""
+
+	def result(self) -> crossword.Puzzle | acrostic.Acrostic:
+		if self.__kind == "crossword":
+			return self.__crossword()
+		elif self.__kind == "acrostic":
+			return self.__acrostic()
+		raise Exception("JPZ file has no crossword or acrostic")
+
+	def __crossword(self) -> crossword.Puzzle:
+		palette: dict[str, colors.Color] = {}
+		squares: list[list[crossword.Square]] = []
+		for row in range(self.__height):
+			row_squares: list[crossword.Square] = []
+			for col in range(self.__width):
+				cell = self.__cells.get((col, row))
+				if cell is None or cell.get("type") in ("block", "void"):
+					row_squares.append(crossword.BlackSquare())
+					continue
+				color = cell.get("background-color")
+				if color is not None and color not in palette:
+					palette[color] = colors.Color.from_hex(color)
+				row_squares.append(crossword.WhiteSquare(
+					answer=cell.get("solution"),
+					color=palette[color] if color is not None else None,
+					is_circled=cell.get("background-shape") == "circle",
+					bars=frozenset(
+						side for side in crossword.SquareSide
+						if cell.get(bar_attribute(side)) == "true"
+					)
+				))
+			squares.append(row_squares)
+		grid = crossword.Grid(squares)
+		clue_dicts: tuple[dict[int, crossword.FormattableText], dict[int, crossword.FormattableText]] = ({}, {})
+		for (index, (title, clues)) in enumerate(self.__clue_lists[:2]):
+			direction = (
+				0 if title.lower().startswith("across")
+				else 1 if title.lower().startswith("down")
+				else index
+			)
+			for (word_id, number, element) in clues:
+				clue_number = self.__clue_number(number, word_id, grid.numbering)
+				if clue_number is not None:
+					clue_dicts[direction][clue_number] = element_text(element)
+		note = self.__metadata.get("description", self.__metadata.get("instructions"))
+		return crossword.Puzzle(
+			grid=grid,
+			across=clue_dicts[0],
+			down=clue_dicts[1],
+			title=self.__optional_text("title"),
+			author=self.__optional_text("creator"),
+			copyright=self.__optional_text("copyright"),
+			note=element_text(note) if note is not None else None,
+			show_note_on_open="description" in self.__metadata
+		)
+
+	def __clue_number(self, number: str, word_id: str, numbering: crossword.Numbering) -> int | None:
+		if number.strip().isdecimal():
+			return int(number)
+		cells = self.__words.get(word_id)
+		if not cells:
+			return None
+		(col, row) = cells[0]
+		return numbering.number_at(row, col)
+
+	def __optional_text(self, tag: str) -> crossword.FormattableText | None:
+		element = self.__metadata.get(tag)
+		return element_text(element) if element is not None else None
+
+	def __acrostic(self) -> acrostic.Acrostic:
+		letter_positions: dict[str, tuple[int, int]] = {}
+		clues: list[str] = []
+		for (_, clue_list) in self.__clue_lists:
+			for (word_id, _, element) in clue_list:
+				if word_id in (GRID_WORD_ID, ATTRIB_WORD_ID):
+					continue
+				clue_index = int(word_id)
+				for (clue_word_index, position) in enumerate(self.__words.get(word_id, [])):
+					cell = self.__cells.get(position, {})
+					letter_positions[cell.get("number", "")] = (clue_index, clue_word_index)
+				clues.append("".join(element.itertext()))
+		quote_height = next(
+			(
+				row for row in range(self.__height)
+				if all(
+					self.__cells.get((col, row), {}).get("type") == "void"
+					for col in range(self.__width)
+				)
+			),
+			self.__height
+		)
+		squares: list[acrostic.AcrosticSquare] = []
+		for row in range(quote_height):
+			for col in range(self.__width):
+				cell = self.__cells.get((col, row), {})
+				cell_type = cell.get("type")
+				if cell_type == "block" or cell_type == "void":
+					squares.append(acrostic.PunctuationSquare(" "))
+				elif cell_type == "clue":
+					squares.append(acrostic.PunctuationSquare(cell.get("solution", " ")))
+				else:
+					(clue_index, clue_word_index) = letter_positions.get(
+						cell.get("number", ""),
+						(string.ascii_uppercase.index(cell.get("top-right-number", "A")), 0)
+					)
+					squares.append(acrostic.LetterSquare(cell.get("solution", ""), clue_index, clue_word_index))
+		while (
+			len(squares) > 0
+			and isinstance(squares[-1], acrostic.PunctuationSquare)
+			and squares[-1].punctuation == " "
+		):
+			squares.pop()
+		(quote_text, _, attribution) = (self.__completion or "").partition("\n\n\u2014 ")
+		(quote_author, _, quote_work) = (
+			attribution.partition(", ") if ", " in attribution
+			else ("", "", attribution)
+		)
+		return acrostic.Acrostic(
+			squares=squares,
+			clues=clues,
+			quote_text=quote_text,
+			quote_author=quote_author,
+			quote_work=quote_work,
+			title=self.__plain_text("title"),
+			author=self.__plain_text("creator"),
+			copyright=self.__plain_text("copyright")
+		)
+
+	def __plain_text(self, tag: str) -> str:
+		element = self.__metadata.get(tag)
+		return "".join(element.itertext()) if element is not None else ""
+
+def element_text(element: ET.Element) -> crossword.FormattableText:
+	if len(element) == 0:
+		return crossword.FormattableText(element.text or "")
+	return crossword.FormattableText(plain_text(element), inner_html(element))
+
+def plain_text(element: ET.Element) -> str:
+	parts = [element.text or ""]
+	for child in element:
+		parts.append("\n" if local_name(child.tag) == "br" else plain_text(child))
+		parts.append(child.tail or "")
+	return "".join(parts)
+
+def inner_html(element: ET.Element) -> str:
+	parts = [escape_text(element.text or "")]
+	for child in element:
+		tag = local_name(child.tag)
+		attrib = attributes({local_name(key): value for (key, value) in child.attrib.items()})
+		if len(child) == 0 and not child.text:
+			parts.append(f"<{tag}{attrib}/>")
+		else:
+			parts.append(f"<{tag}{attrib}>{inner_html(child)}</{tag}>")
+		parts.append(escape_text(child.tail or ""))
+	return "".join(parts)
+
+def benchmark(directory: str) -> tuple[int, float]:
+	import glob
+	import os
+	import time
+	paths = glob.glob(os.path.join(directory, "**", "*.jpz"), recursive=True)
+	start = time.perf_counter()
+	for path in paths:
+		load_jpz(path)
+	return (len(paths), time.perf_counter() - start)
+
+if __name__ == "__main__":
+	import sys
+	(count, elapsed) = benchmark(sys.argv[1] if len(sys.argv) > 1 else "puzzles")
+	print(f"Loaded {count} puzzles in {elapsed:.2f}s, {count / elapsed if elapsed > 0 else 0:.1f} puzzles/s")
\ No newline at end of file
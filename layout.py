@@ -0,0 +1,25 @@
+import crossword
+from colors import Color
+
+SIZE_FACTOR = 0.8
+
+def square_color(square: crossword.Square) -> Color:
+	return (
+		(square.color or Color.White) if isinstance(square, crossword.WhiteSquare)
+		else Color.Black
+	)
+
+def border_line(
+	corners_xy: tuple[tuple[float, float], tuple[float,float]],
+	side: crossword.SquareSide
+) -> tuple[tuple[float, float], tuple[float, float]]:
+	((x1, y1), (x2, y2)) = corners_xy
+	match side:
+		case crossword.SquareSide.TOP:
+			return ((x1, y1), (x2, y1))
+		case crossword.SquareSide.RIGHT:
+			return ((x2, y1), (x2, y2))
+		case crossword.SquareSide.BOTTOM:
+			return ((x1, y2), (x2, y2))
+		case crossword.SquareSide.LEFT:
+			return ((x1, y1), (x1, y2))
\ No newline at end of file
@@ -0,0 +1,72 @@
+import json
+import os
+import threading
+import nyt_json
+
+MANIFEST_NAME = "manifest.jsonl"
+
+class Manifest(object):
+	def __init__(self, destination: str):
+		self.__destination = destination
+		self.__path = os.path.join(destination, MANIFEST_NAME)
+		self.__entries: dict[int, tuple[int, list[str], list[str]]] = {}
+		self.__lock = threading.Lock()
+		self.__partial_line = False
+		if os.path.exists(self.__path):
+			with open(self.__path, "r", encoding="utf-8") as reader:
+				data = reader.read()
+			self.__partial_line = len(data) > 0 and not data.endswith("\n")
+			for line in data.splitlines():
+				try:
+					entry = json.loads(line)
+				except ValueError:
+					continue
+				self.__entries[entry["puzzle_id"]] = (entry["version"], entry["files"], entry.get("missing", []))
+
+	def is_outdated(self, puzzle: nyt_json.PuzzleResult) -> bool:
+		with self.__lock:
+			entry = self.__entries.get(puzzle["puzzle_id"])
+		return entry is not None and entry[0] != puzzle["version"]
+
+	def is_current(self, puzzle: nyt_json.PuzzleResult) -> bool:
+		with self.__lock:
+			entry = self.__entries.get(puzzle["puzzle_id"])
+		if entry is None:
+			return False
+		(version, files, missing) = entry
+		return (
+			version == puzzle["version"]
+			and len(files) > 0
+			and len(missing) == 0
+			and all(os.path.exists(os.path.join(self.__destination, file)) for file in files)
+		)
+
+	def is_saved(self, puzzle: nyt_json.PuzzleResult, file: str) -> bool:
+		with self.__lock:
+			entry = self.__entries.get(puzzle["puzzle_id"])
+		if entry is None:
+			return False
+		(version, files, _) = entry
+		return (
+			version == puzzle["version"]
+			and os.path.relpath(file, self.__destination) in files
+			and os.path.exists(file)
+		)
+
+	def record(self, puzzle: nyt_json.PuzzleResult, files: list[str], missing: list[str] | None = None):
+		relative = [os.path.relpath(file, self.__destination) for file in files]
+		relative_missing = [os.path.relpath(file, self.__destination) for file in missing or []]
+		line = json.dumps({
+			"puzzle_id": puzzle["puzzle_id"],
+			"version": puzzle["version"],
+			"files": relative,
+			"missing": relative_missing
+		})
+		with self.__lock:
+			os.makedirs(self.__destination, exist_ok=True)
+			with open(self.__path, "a", encoding="utf-8") as writer:
+				if self.__partial_line:
+					writer.write("\n")
+					self.__partial_line = False
+				writer.write(line + "\n")
+			self.__entries[puzzle["puzzle_id"]] = (puzzle["version"], relative, relative_missing)
\ No newline at end of file
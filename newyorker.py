@@ -1,12 +1,11 @@
 import datetime
-import requests
-from bs4 import BeautifulSoup
 import re
 import json
 from typing import Any, Iterable, Iterator, NamedTuple, TypeVar
 import crossword
-import crossword_nexus
-import image
+import fetch
+import colors
+import richtext
 import sys
 
 js_expr = re.compile(r"window.__PRELOADED_STATE__ = (?P<json>.*);")
@@ -21,13 +20,11 @@ def puzzle_url(date: datetime.date, puzzle_type: str = "crossword"):
 
 def download_puzzle(
 	url: str,
+	ttl: float = fetch.LISTING_TTL
 ) -> crossword.Puzzle:
-	page = BeautifulSoup(
-		requests.get(url).text,
-		features="html.parser"
-	)
+	page = richtext.RichText.from_html(fetch.get(url, ttl=ttl).text)
 	script_tags = page.find_all("script")
-	results = (js_expr.fullmatch(tag.text) for tag in script_tags)
+	results = (js_expr.fullmatch(tag.text()) for tag in script_tags)
 	try:
 		jsons = [assert_not_none(match.group("json")) for match in results if match]
 		[state_json] = jsons
@@ -37,11 +34,12 @@ def download_puzzle(
 		)
 	except IndexError, ValueError, KeyError, TypeError:
 		raise ValueError("Could not find the New Yorker puzzle")
-	puzzle = requests.get(
+	puzzle = fetch.get(
 		f"https://puzzles-games-api.gp-prod.conde.digital/api/v1/games/{puzzle_id}",
 		headers={
 			"User-Agent": "Mozilla/5.0"
-		}
+		},
+		ttl=fetch.FOREVER
 	).json()
 	if puzzle["gameType"] != "crossword":
 		raise ValueError("Not a crossword puzzle")
@@ -139,22 +137,30 @@ def first_not_none(iterable: Iterable[T | None]) -> T | None:
 			return value
 	return None
 
-def parse_clue(clue: str) -> BeautifulSoup:
-	result = BeautifulSoup()
+def parse_clue(clue: str) -> richtext.RichText:
+	return richtext.RichText(parse_clue_nodes(clue))
+
+def parse_clue_nodes(clue: str) -> list[richtext.Node]:
+	nodes: list[richtext.Node] = []
+	text: list[str] = []
 	char_iter = iter(clue)
 	for char in char_iter:
 		if char == "{":
+			if len(text) > 0:
+				nodes.append("".join(text))
+				text.clear()
 			bracketed = advance_to_close(char_iter)
-			result.append(parse_brackets(bracketed))
+			nodes.append(parse_brackets(bracketed))
 		else:
-			result.append(result.new_string(char))
-	return result
+			text.append(char)
+	if len(text) > 0:
+		nodes.append("".join(text))
+	return nodes
 
-def parse_brackets(bracketed: str) -> BeautifulSoup:
+def parse_brackets(bracketed: str) -> richtext.Element:
 	match = assert_not_none(bracket_expr.fullmatch(bracketed))
 	symbol: str = match.group("symbol")
 	contents: str = match.group("contents")
-	soup = BeautifulSoup()
 	try:
 		(prop, val) = {
 			"/": ("font-style", "italic"),
@@ -163,11 +169,11 @@ def parse_brackets(bracketed: str) -> BeautifulSoup:
 		}[symbol]
 	except KeyError:
 		raise ValueError(f"Unknown symbol {symbol}")
-	node = soup.new_tag("span")
-	node["style"] = f"{prop}:{val}"
-	node.append(parse_clue(contents))
-	soup.append(node)
-	return soup
+	return richtext.Element(
+		"span",
+		{"style": f"{prop}:{val}"},
+		parse_clue_nodes(contents)
+	)
 
 def advance_to_close(char_iter: Iterator[str]) -> str:
 	depth = 1
@@ -184,7 +190,7 @@ def advance_to_close(char_iter: Iterator[str]) -> str:
 
 class CellDesign(NamedTuple):
 	bars: frozenset[crossword.SquareSide]
-	color: image.Color | None
+	color: colors.Color | None
 	is_circled: bool
 
 	@staticmethod
@@ -214,9 +220,9 @@ class GridDesign(object):
 	@staticmethod
 	def __parse_design__(design: str) -> list[list[CellDesign]]:
 		[style_html, grid] = design.strip().split("\n\n")
-		style_soup = BeautifulSoup(style_html, features="html.parser")
+		style_document = richtext.RichText.from_html(style_html)
 		style = GridDesign.__parse_cssish__(
-			assert_not_none(style_soup.find("style")).text
+			assert_not_none(next(style_document.find_all("style"), None)).text()
 		)
 		designs = {
 			tag: GridDesign.__cell_design__(rules)
@@ -259,7 +265,7 @@ class GridDesign(object):
 		])
 		color_hex = rules.get("background-dark")
 		color = (
-			image.Color.from_hex(color_hex)
+			colors.Color.from_hex(color_hex)
 			if color_hex is not None
 			else None
 		)
@@ -283,7 +289,10 @@ class GridDesign(object):
 def daily_puzzle(date: datetime.date | None = None):
 	date = date or datetime.date.today()
 	puzzle_type = "mini-crossword" if date.weekday() >= 3 else "crossword"
-	return download_puzzle(f"https://www.newyorker.com/puzzles-and-games-dept/{puzzle_type}/{date.year:04}/{date.month:02}/{date.day:02}")
+	return download_puzzle(
+		f"https://www.newyorker.com/puzzles-and-games-dept/{puzzle_type}/{date.year:04}/{date.month:02}/{date.day:02}",
+		fetch.date_ttl(date)
+	)
 
 T = TypeVar("T")
 def assert_not_none(value: T | None) -> T:
@@ -302,4 +311,5 @@ def arg_date(argv: list[str]) -> datetime.date:
 			return datetime.date.today()
 
 if __name__ == "__main__":
+	import crossword_nexus
 	crossword_nexus.open_puzzle(daily_puzzle(arg_date(sys.argv)))
\ No newline at end of file
@@ -1,7 +1,11 @@
 import datetime
-import requests
+from array import array
+from collections.abc import Callable
+from typing import TypeGuard
+from concurrent.futures import Future, ThreadPoolExecutor
 import crossword
 import acrostic
+import archive
 import string
 import re
 import json
@@ -9,15 +13,26 @@ import base64
 import urllib.parse
 import os
 import sys
-import image
+import fetch
+import colors
 import jpz
+import manifest
 import nyt_json
-import crossword_nexus
+import cwb
+
+try:
+	from orjson import loads as loads_json
+except ImportError:
+	from json import loads as loads_json
 
 WHITE_SQUARE = 1
 CIRCLED_SQUARE = 2
 SHADED_SQUARE = 3
 CIRCLED_SHADED_SQUARE = 4
+SHADED_COLOR = colors.Color(0xdc, 0xdc, 0xdc)
+PUZZLE_URL_PATH = "/svc/crosswords/v6/puzzle/"
+PuzzlePart = crossword.Puzzle | acrostic.Acrostic | bytes
+
 MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
 
 def puzzles_for_dates(
@@ -25,9 +40,10 @@ def puzzles_for_dates(
 	end_date: datetime.date,
 	format_type: str | None = None,
 	publish_type: str | None = None,
-	nyt_s: str | None = None
+	nyt_s: str | None = None,
+	fetcher: fetch.Fetcher | None = None
 ) -> list[nyt_json.PuzzleResult]:
-	puzzles: nyt_json.PuzzleList = requests.get(
+	puzzles: nyt_json.PuzzleList = (fetcher or fetch.fetcher).get(
 		"https://edge.games.nyti.nyt.net/svc/crosswords/v3/puzzles.json",
 		params={
 			"format_type": format_type,
@@ -36,22 +52,42 @@ def puzzles_for_dates(
 			"date_end": end_date.isoformat()
 		}, headers={
 			"nyt-s": nyt_s
-		} if nyt_s is not None else None
+		} if nyt_s is not None else None,
+		ttl=fetch.LISTING_TTL
 	).json()
 	return puzzles["results"] or []
 
-def cell_to_square(cell: nyt_json.Cell | nyt_json.BlackCell) -> crossword.Square:
-	if "type" in cell:
+def cells_to_grid(cells: list[nyt_json.Cell | nyt_json.BlackCell], rows: int, cols: int) -> crossword.PackedGrid:
+	flags = bytearray(rows * cols)
+	answer_indexes = array("H", bytes(2 * rows * cols))
+	color_indexes = array("B", bytes(rows * cols))
+	answers: list[str | None] = [None]
+	answer_lookup: dict[str, int] = {}
+	palette: list[colors.Color | None] = [None]
+	for (index, cell) in enumerate(cells):
+		if not is_white_cell(cell):
+			continue
 		cell_type = cell["type"]
-		is_shaded = cell_type == SHADED_SQUARE or cell_type == CIRCLED_SHADED_SQUARE
-		is_circled = cell_type == CIRCLED_SQUARE or cell_type == CIRCLED_SHADED_SQUARE
-		return crossword.WhiteSquare(
-			answer=cell.get("answer"),
-			color=image.Color(0xdc, 0xdc, 0xdc) if is_shaded else None,
-			is_circled=is_circled
-		)
-	else:
-		return crossword.BlackSquare()
+		if cell_type == CIRCLED_SQUARE or cell_type == CIRCLED_SHADED_SQUARE:
+			flags[index] = crossword.WHITE_FLAG | crossword.CIRCLED_FLAG
+		else:
+			flags[index] = crossword.WHITE_FLAG
+		if cell_type == SHADED_SQUARE or cell_type == CIRCLED_SHADED_SQUARE:
+			if len(palette) == 1:
+				palette.append(SHADED_COLOR)
+			color_indexes[index] = 1
+		answer = cell.get("answer")
+		if answer is not None:
+			answer_index = answer_lookup.get(answer)
+			if answer_index is None:
+				answer_index = len(answers)
+				answer_lookup[answer] = answer_index
+				answers.append(sys.intern(answer))
+			answer_indexes[index] = answer_index
+	return crossword.PackedGrid.from_packed(rows, cols, flags, answers, answer_indexes, palette, color_indexes)
+
+def is_white_cell(cell: nyt_json.Cell | nyt_json.BlackCell) -> TypeGuard[nyt_json.Cell]:
+	return "type" in cell
 
 def dict_to_clue(clue: nyt_json.Clue) -> crossword.FormattableText:
 	return crossword.FormattableText(
@@ -62,54 +98,66 @@ def dict_to_clue(clue: nyt_json.Clue) -> crossword.FormattableText:
 def format_date(date: datetime.date, weekday: bool = True):
 	return f"{date.strftime('%A, %B' if weekday else '%B')} {date.day}, {date.year}"
 
-def download_json(date: datetime.date, publish_type: str, nyt_s: str) -> nyt_json.Puzzle:
+def download_json(
+	date: datetime.date,
+	publish_type: str,
+	nyt_s: str,
+	fetcher: fetch.Fetcher | None = None
+) -> nyt_json.Puzzle:
 	url = f"https://www.nytimes.com/svc/crosswords/v6/puzzle/{publish_type}/{date.isoformat()}.json"
-	result = requests.get(
+	result = (fetcher or fetch.fetcher).get(
 		url,
 		cookies={
 			"NYT-S": nyt_s
-		}
+		},
+		ttl=fetch.date_ttl(date)
 	)
 	if result.status_code != 200:
 		raise Exception(f"Request to {url} returned HTTP {result.status_code} error")
-	return result.json()
+	return loads_json(result.content)
 
 def download_today() -> crossword.Puzzle:
 	return download_puzzle(datetime.date.today(), "daily", token())
 
-def download_puzzle(date: datetime.date, publish_type: str, nyt_s: str) -> crossword.Puzzle:
-	puzzle = download_json(date, publish_type, nyt_s)
+def download_puzzle(
+	date: datetime.date,
+	publish_type: str,
+	nyt_s: str,
+	fetcher: fetch.Fetcher | None = None
+) -> crossword.Puzzle:
+	return json_to_puzzle(download_json(date, publish_type, nyt_s, fetcher))
+
+def loads_puzzle(data: bytes | str) -> crossword.Puzzle:
+	return json_to_puzzle(loads_json(data))
+
+def json_to_puzzle(puzzle: nyt_json.Puzzle) -> crossword.Puzzle:
 	puzzle_dict = puzzle["body"][0]
 	width = puzzle_dict["dimensions"]["width"]
 	height = puzzle_dict["dimensions"]["height"]
+	across: dict[int, crossword.FormattableText] = {}
+	down: dict[int, crossword.FormattableText] = {}
+	for clue in puzzle_dict["clues"]:
+		(across if clue["direction"] == "Across" else down)[int(clue["label"])] = dict_to_clue(clue)
 	
 	return crossword.Puzzle(
-		grid=crossword.Grid([
-			[cell_to_square(puzzle_dict["cells"][row * width + col]) for col in range(width)]
-			for row in range(height)
-		]),
-		across={
-			int(puzzle_dict["clues"][i]["label"]): dict_to_clue(puzzle_dict["clues"][i])
-			for i in puzzle_dict["clueLists"][0]["clues"]
-		},
-		down={
-			int(puzzle_dict["clues"][i]["label"]): dict_to_clue(puzzle_dict["clues"][i])
-			for i in puzzle_dict["clueLists"][1]["clues"]
-		},
+		grid=cells_to_grid(puzzle_dict["cells"], height, width),
+		across=across,
+		down=down,
 		title=crossword.FormattableText(puzzle.get("title", "The Crossword")),
 		author=crossword.FormattableText(", ".join(puzzle["constructors"])) if "constructors" in puzzle else None,
 		copyright=crossword.FormattableText(format_date(
 			datetime.date.fromisoformat(puzzle["publicationDate"])
 		)),
-		note=puzzle["notes"][0]["text"] if "notes" in puzzle else None
+		note=crossword.FormattableText(html=puzzle["notes"][0]["text"]) if "notes" in puzzle else None
 	)
 
-def download_acrostic(date: datetime.date, nyt_s: str) -> acrostic.Acrostic:
-	html_data = requests.get(
+def download_acrostic(date: datetime.date, nyt_s: str, fetcher: fetch.Fetcher | None = None) -> acrostic.Acrostic:
+	html_data = (fetcher or fetch.fetcher).get(
 		f"https://www.nytimes.com/puzzles/acrostic/{date.year:0>4}/{date.month:0>2}/{date.day:0>2}",
 		cookies={
 			"NYT-S": nyt_s
-		}
+		},
+		ttl=fetch.date_ttl(date)
 	).text
 	match = re.search(r"window\.gameData\s+=\s+(\".*?\")", html_data)
 	assert match is not None
@@ -174,14 +222,20 @@ def json_to_acrostic(game_json: str) -> acrostic.Acrostic:
 		copyright=game_data["puzzle_meta"]["displayDate"]
 	)
 
-def pdf_data(date: datetime.date, publish_type: str, answer: bool, nyt_s: str) -> bytes:
+def pdf_data(
+	date: datetime.date,
+	publish_type: str,
+	answer: bool,
+	nyt_s: str,
+	fetcher: fetch.Fetcher | None = None
+) -> bytes:
 	date_str = MONTHS[date.month - 1] + date.strftime("%d%y")
 	publish_ext = ".2" if publish_type == "Variety" else ".3" if publish_type == "Assorted" else ""
 	answer_ext = ".ans" if answer else ""
 	url = f"https://www.nytimes.com/svc/crosswords/v2/puzzle/print/{date_str}{publish_ext}{answer_ext}.pdf"
-	response = requests.get(url, cookies = {
+	response = (fetcher or fetch.fetcher).get(url, cookies = {
 		"nyt-s": nyt_s
-	})
+	}, ttl=fetch.date_ttl(date))
 	if response.status_code != 200:
 		raise Exception(f"Could not download {url}")
 	return response.content
@@ -189,56 +243,189 @@ def pdf_data(date: datetime.date, publish_type: str, answer: bool, nyt_s: str) -
 def safe_filename(name: str) -> str:
 	return re.sub(r"[^\w. -]", "_", name.strip())
 
-def download_puzzles(destination: str, start_year: int, end_year: int, nyt_s: str):
-	for year in range(start_year, end_year + 1):
-		year_start = datetime.date(year, 1, 1)
-		year_end = datetime.date(year, 12, 31)
-		puzzles = (
-			puzzles_for_dates(year_start, year_end, publish_type="bonus", nyt_s=nyt_s)
-			+ puzzles_for_dates(year_start, year_end, format_type="acrostic", nyt_s=nyt_s)
-			+ puzzles_for_dates(year_start, year_end, format_type="pdf,normal,diagramless", publish_type="variety,assorted", nyt_s=nyt_s)
+def download_puzzles(
+	destination: str,
+	start_year: int,
+	end_year: int,
+	nyt_s: str,
+	workers: int = 4,
+	requests_per_second: float | None = 4,
+	fetcher: fetch.Fetcher | None = None
+) -> int:
+	if fetcher is None:
+		fetcher = fetch.Fetcher(workers, requests_per_second, fetch.fetcher.cache, fetch.fetcher.fixtures)
+	puzzle_manifest = manifest.Manifest(destination)
+	with ThreadPoolExecutor(max_workers=workers) as executor:
+		listings = executor.map(
+			lambda year: year_puzzles(year, nyt_s, fetcher),
+			range(start_year, end_year + 1)
 		)
-		for puzzle in puzzles:
-			print_date = datetime.date.fromisoformat(puzzle["print_date"])
-			format_type = puzzle["format_type"]
-			publish_type = puzzle["publish_type"]
-			title = puzzle["title"]
-			path = os.path.join(
-				destination,
-				"PDFs" if format_type == "PDF" or format_type == "Diagramless"
-					else "Bonus" if publish_type == "Bonus"
-					else "Acrostic" if format_type == "Acrostic"
-					else "Variety",
-				f"{print_date.year}"
+		downloads = [
+			(puzzle, executor.submit(save_puzzle, destination, puzzle, nyt_s, puzzle_manifest, fetcher))
+			for puzzles in listings
+			for puzzle in puzzles
+			if not puzzle_manifest.is_current(puzzle)
+		]
+		return report_failures(downloads)
+
+def report_failures(downloads: list[tuple[nyt_json.PuzzleResult, Future[None]]]) -> int:
+	failures = 0
+	for (puzzle, future) in downloads:
+		try:
+			future.result()
+		except Exception as e:
+			failures += 1
+			sys.stderr.write(f"Error downloading puzzle {puzzle['title']} for {puzzle['print_date']}: {e}\n")
+	return failures
+
+def download_archive(
+	archive_path: str,
+	start_year: int,
+	end_year: int,
+	nyt_s: str,
+	workers: int = 4,
+	requests_per_second: float | None = 4,
+	fetcher: fetch.Fetcher | None = None
+) -> int:
+	if fetcher is None:
+		fetcher = fetch.Fetcher(workers, requests_per_second, fetch.fetcher.cache, fetch.fetcher.fixtures)
+	with archive.Archive(archive_path) as puzzle_archive:
+		with ThreadPoolExecutor(max_workers=workers) as executor:
+			listings = executor.map(
+				lambda year: year_puzzles(year, nyt_s, fetcher),
+				range(start_year, end_year + 1)
 			)
+			downloads = [
+				(puzzle, executor.submit(archive_puzzle, puzzle_archive, puzzle, nyt_s, fetcher))
+				for puzzles in listings
+				for puzzle in puzzles
+				if not puzzle_archive.is_current(puzzle)
+			]
+			return report_failures(downloads)
+
+def archive_puzzle(
+	puzzle_archive: archive.Archive,
+	puzzle: nyt_json.PuzzleResult,
+	nyt_s: str,
+	fetcher: fetch.Fetcher | None = None
+):
+	def save_part(name: str, data: PuzzlePart):
+		puzzle_archive.append(puzzle, name, data if isinstance(data, bytes) else cwb.dumps_cwb(data))
+
+	with fetch.refreshing(puzzle_archive.is_outdated(puzzle)):
+		download_parts(
+			puzzle,
+			nyt_s,
+			lambda name: puzzle_archive.has_part(puzzle, name),
+			save_part,
+			fetcher
+		)
+
+def download_parts(
+	puzzle: nyt_json.PuzzleResult,
+	nyt_s: str,
+	has_part: Callable[[str], bool],
+	save_part: Callable[[str, PuzzlePart], None],
+	fetcher: fetch.Fetcher | None = None
+) -> list[str]:
+	print_date = datetime.date.fromisoformat(puzzle["print_date"])
+	publish_type = puzzle["publish_type"]
+	missing: list[str] = []
+	match puzzle["format_type"]:
+		case "Normal":
+			save_part(archive.PUZZLE_PART, download_puzzle(print_date, publish_type.lower(), nyt_s, fetcher))
+		case "PDF":
+			if not has_part(archive.PDF_PART):
+				save_part(archive.PDF_PART, pdf_data(print_date, publish_type, False, nyt_s, fetcher))
 			try:
-				os.makedirs(path, exist_ok=True)
-				if format_type == "Normal":
-					jpz.save_crossword_jpz(
-						download_puzzle(print_date, publish_type.lower(), nyt_s),
-						os.path.join(path, f"{print_date.isoformat()} {safe_filename(title)}.jpz")
-					)
-				elif format_type == "PDF":
-					with open(os.path.join(path, f"{print_date.isoformat()} {safe_filename(title)}.pdf"), "wb") as f:
-						f.write(pdf_data(print_date, publish_type, False, nyt_s))
-					try:
-						answer_data = pdf_data(print_date, publish_type, True, nyt_s)
-						answer_dir = os.path.join(path, "Answers")
-						os.makedirs(answer_dir, exist_ok=True)
-						with open(os.path.join(answer_dir, f"{print_date.isoformat()} {safe_filename(title)} Answer.pdf"), "wb") as f:
-							f.write(answer_data)
-					except: pass
-				elif format_type == "Acrostic":
-					jpz.save_acrostic_jpz(
-						download_acrostic(print_date, nyt_s),
-						os.path.join(path, f"{print_date.isoformat()} {safe_filename(title)}.jpz")
-					)
+				answer_data = pdf_data(print_date, publish_type, True, nyt_s, fetcher)
 			except Exception as e:
-				sys.stderr.write(f"Error downloading puzzle {title} for {print_date.isoformat()}: {e}\n")
+				sys.stderr.write(f"Error downloading answers for {puzzle['title']} for {print_date.isoformat()}: {e}\n")
+				missing.append(archive.ANSWER_PDF_PART)
+			else:
+				save_part(archive.ANSWER_PDF_PART, answer_data)
+		case "Acrostic":
+			save_part(archive.PUZZLE_PART, download_acrostic(print_date, nyt_s, fetcher))
+	return missing
+
+def year_puzzles(year: int, nyt_s: str, fetcher: fetch.Fetcher | None = None) -> list[nyt_json.PuzzleResult]:
+	year_start = datetime.date(year, 1, 1)
+	year_end = datetime.date(year, 12, 31)
+	return (
+		puzzles_for_dates(year_start, year_end, publish_type="bonus", nyt_s=nyt_s, fetcher=fetcher)
+		+ puzzles_for_dates(year_start, year_end, format_type="acrostic", nyt_s=nyt_s, fetcher=fetcher)
+		+ puzzles_for_dates(year_start, year_end, format_type="pdf,normal,diagramless", publish_type="variety,assorted", nyt_s=nyt_s, fetcher=fetcher)
+	)
+
+def save_puzzle(
+	destination: str,
+	puzzle: nyt_json.PuzzleResult,
+	nyt_s: str,
+	puzzle_manifest: manifest.Manifest | None = None,
+	fetcher: fetch.Fetcher | None = None
+):
+	print_date = datetime.date.fromisoformat(puzzle["print_date"])
+	format_type = puzzle["format_type"]
+	publish_type = puzzle["publish_type"]
+	title = puzzle["title"]
+	path = os.path.join(
+		destination,
+		"PDFs" if format_type == "PDF" or format_type == "Diagramless"
+			else "Bonus" if publish_type == "Bonus"
+			else "Acrostic" if format_type == "Acrostic"
+			else "Variety",
+		f"{print_date.year}"
+	)
+	name = f"{print_date.isoformat()} {safe_filename(title)}"
+	paths = {
+		archive.PUZZLE_PART: os.path.join(path, f"{name}.jpz"),
+		archive.PDF_PART: os.path.join(path, f"{name}.pdf"),
+		archive.ANSWER_PDF_PART: os.path.join(path, "Answers", f"{name} Answer.pdf")
+	}
+
+	def save_part(part: str, data: PuzzlePart):
+		file_path = paths[part]
+		os.makedirs(os.path.dirname(file_path), exist_ok=True)
+		if isinstance(data, bytes):
+			with open(file_path, "wb") as f:
+				f.write(data)
+		elif isinstance(data, acrostic.Acrostic):
+			jpz.save_acrostic_jpz(data, file_path)
+		else:
+			jpz.save_crossword_jpz(data, file_path)
+
+	with fetch.refreshing(puzzle_manifest is not None and puzzle_manifest.is_outdated(puzzle)):
+		missing = download_parts(
+			puzzle,
+			nyt_s,
+			lambda part: puzzle_manifest is not None and puzzle_manifest.is_saved(puzzle, paths[part]),
+			save_part,
+			fetcher
+		)
+	files = [paths[part] for part in archive.expected_parts(puzzle) if part not in missing]
+	if puzzle_manifest is not None and len(files) > 0:
+		puzzle_manifest.record(puzzle, files, [paths[part] for part in missing])
+
+def benchmark(cache_directory: str) -> tuple[int, float]:
+	import time
+	documents = [
+		response.content
+		for (_, response) in fetch.DiskCache(cache_directory).items()
+		if PUZZLE_URL_PATH in response.url
+	]
+	start = time.perf_counter()
+	for content in documents:
+		loads_puzzle(content)
+	return (len(documents), time.perf_counter() - start)
 
 def token() -> str:
 	with open("nyt-s.txt", encoding="utf-8") as f:
 		return f.read()
 
 if __name__ == "__main__":
-	crossword_nexus.open_puzzle(download_today())
\ No newline at end of file
+	if len(sys.argv) > 2 and sys.argv[1] == "benchmark":
+		(count, elapsed) = benchmark(sys.argv[2])
+		print(f"Converted {count} puzzles in {elapsed:.2f}s, {count / elapsed if elapsed > 0 else 0:.1f} puzzles/s")
+	else:
+		import crossword_nexus
+		crossword_nexus.open_puzzle(download_today())
\ No newline at end of file
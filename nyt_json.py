@@ -56,6 +56,9 @@ class PuzzleBody(TypedDict):
 	dimensions: Dimensions
 	SVG: dict[str, Any]
 
+class Note(TypedDict):
+	text: str
+
 class RelatedContent(TypedDict):
 	text: str
 	url: str
@@ -69,4 +72,5 @@ class Puzzle(TypedDict):
 	lastUpdated: str
 	publicationDate: str
 	title: NotRequired[str]
+	notes: NotRequired[list[Note]]
 	relatedContent: RelatedContent
\ No newline at end of file
@@ -1,8 +1,11 @@
-from io import BufferedReader
 import struct
+from array import array
 from unidecode import unidecode
 from collections.abc import Callable
+from typing import BinaryIO
+import functools
 import crossword
+import files
 
 ENCODING = "ISO-8859-1"
 MAGIC_STRING = b"ACROSS&DOWN\x00"
@@ -28,6 +31,22 @@ class ByteGrid(object):
 		(row, col) = index
 		return self.bytes[row * self.width + col]
 
+class ByteReader(object):
+	def __init__(self, data: bytes):
+		self.__data = data
+		self.__offset = 0
+
+	def read(self, length: int) -> bytes:
+		start = self.__offset
+		self.__offset = min(start + length, len(self.__data))
+		return self.__data[start:self.__offset]
+
+	def read_through(self, terminator: bytes) -> bytes:
+		start = self.__offset
+		end = self.__data.find(terminator, start)
+		self.__offset = len(self.__data) if end < 0 else end + len(terminator)
+		return self.__data[start:self.__offset]
+
 class CString(object):
 	def __init__(self, string: str | bytes):
 		self.__bytes: bytes = (unidecode(string).encode(ENCODING) + b"\x00") if isinstance(string, str) else string
@@ -35,15 +54,11 @@ class CString(object):
 			raise Exception("String is not null-terminated")
 
 	@staticmethod
-	def read(reader: BufferedReader):
-		data = b""
-		while True:
-			byte = reader.read(1)
-			data += byte
-			if byte == b"\x00" or len(byte) == 0:
-				break
+	def read(reader: ByteReader):
+		data = reader.read_through(b"\x00")
+		if len(data) == 0:
+			raise Exception("String is not null-terminated")
 		return CString(data)
-		
 
 	def __str__(self):
 		return self.bytes[:-1].decode(ENCODING)
@@ -61,12 +76,12 @@ class CString(object):
 	def optional(self) -> crossword.FormattableText | None:
 		return crossword.FormattableText(str(self)) if len(self) > 0 else None
 
-def read_extra_sections(reader: BufferedReader):
+def read_extra_sections(reader: ByteReader, verify: bool = True):
 	sections: dict[bytes, bytes] = {}
 	while len(title := reader.read(0x04)) > 0:
 		(length, checksum) = struct.unpack("<HH", reader.read(0x04))
 		data = reader.read(length)
-		if cksum_region(data) != checksum:
+		if verify and cksum_region(data) != checksum:
 			raise Exception("Invalid extra data checksum")
 		if reader.read(1) != b"\x00":
 			raise Exception("Extra data is not null-terminated")
@@ -79,7 +94,7 @@ def encode_extra_section(name: bytes, data: bytes):
 		name, len(data), cksum_region(data)
 	) + data + b"\x00"
 
-def encode_circles(grid: crossword.Grid):
+def encode_circles(grid: crossword.BaseGrid):
 	data: list[int] = []
 	num_circles = 0
 	for (_, square) in grid:
@@ -93,64 +108,80 @@ def encode_circles(grid: crossword.Grid):
 			data.append(0x00)
 	return (num_circles, bytes(data))
 
+@functools.cache
+def rotation_table() -> array:
+	return array("H", ((value >> 1) | ((value & 0x0001) << 15) for value in range(0x10000)))
+
 def cksum_region(data: bytes, init: int = 0):
+	rotate = rotation_table()
 	checksum = init
 	for byte in data:
-		if checksum & 0x0001 == 1:
-			checksum = (checksum >> 1) + 0x8000
-		else:
-			checksum = checksum >> 1
-		checksum += byte
-		checksum %= 0x10000
+		checksum = rotate[checksum] + byte
+		if checksum > 0xffff:
+			checksum -= 0x10000
 	return checksum
 
-def string_checksum(
-	title: CString, author: CString, copyright: CString,
-	clues: list[CString], notes: CString,
-	init: int = 0
-):
+def cksum_regions(data: bytes, init: int, chained: int) -> tuple[int, int]:
+	rotate = rotation_table()
 	checksum = init
-	if len(title) > 0:
-		checksum = cksum_region(title.bytes, checksum)
-	if len(author) > 0:
-		checksum = cksum_region(author.bytes, checksum)
-	if len(copyright) > 0:
-		checksum = cksum_region(copyright.bytes, checksum)
-	for clue in clues:
-		checksum = cksum_region(clue.bytes[:-1], checksum)
-	if len(notes) > 0:
-		checksum = cksum_region(notes.bytes, checksum)
-	return checksum
+	for byte in data:
+		checksum = rotate[checksum] + byte
+		if checksum > 0xffff:
+			checksum -= 0x10000
+		chained = rotate[chained] + byte
+		if chained > 0xffff:
+			chained -= 0x10000
+	return (checksum, chained)
 
-def overall_checksum(
-	cib: bytes, solution: ByteGrid, state: ByteGrid,
+def string_checksums(
 	title: CString, author: CString, copyright: CString,
-	clues: list[CString], notes: CString
-):
-	checksum = cksum_region(cib)
-	checksum = cksum_region(solution.bytes, checksum)
-	checksum = cksum_region(state.bytes, checksum)
-	return string_checksum(title, author, copyright, clues, notes, checksum)
-
-def masked_checksums(
-	cib: bytes, solution: ByteGrid, state: ByteGrid,
-	title: CString, author: CString, copyright: CString,
-	clues: list[CString], notes: CString
-):
-	c_cib = cksum_region(cib)
-	c_sol = cksum_region(solution.bytes)
-	c_grid = cksum_region(state.bytes)
-	c_part = string_checksum(title, author, copyright, clues, notes)
-	return bytes([
-		0x49 ^ (c_cib & 0xff),
-		0x43 ^ (c_sol & 0xff),
-		0x48 ^ (c_grid & 0xff),
-		0x45 ^ (c_part & 0xff),
-		0x41 ^ ((c_cib & 0xff00) >> 8),
-		0x54 ^ ((c_sol & 0xff00) >> 8),
-		0x45 ^ ((c_grid & 0xff00) >> 8),
-		0x44 ^ ((c_part & 0xff00) >> 8)
-	])
+	clues: list[CString], notes: CString,
+	chained: int
+) -> tuple[int, int]:
+	regions = [
+		*(string.bytes for string in (title, author, copyright) if len(string) > 0),
+		*(clue.bytes[:-1] for clue in clues),
+		*((notes.bytes,) if len(notes) > 0 else ())
+	]
+	checksum = 0
+	for region in regions:
+		(checksum, chained) = cksum_regions(region, checksum, chained)
+	return (checksum, chained)
+
+class Checksums(object):
+	def __init__(
+		self,
+		cib: bytes, solution: ByteGrid, state: ByteGrid,
+		title: CString, author: CString, copyright: CString,
+		clues: list[CString], notes: CString
+	):
+		self.__cib = cksum_region(cib)
+		(self.__solution, overall) = cksum_regions(solution.bytes, 0, self.__cib)
+		(self.__state, overall) = cksum_regions(state.bytes, 0, overall)
+		(self.__strings, self.__overall) = string_checksums(
+			title, author, copyright, clues, notes, overall
+		)
+
+	@property
+	def cib(self):
+		return self.__cib
+
+	@property
+	def overall(self):
+		return self.__overall
+
+	@property
+	def masked(self):
+		return bytes([
+			0x49 ^ (self.__cib & 0xff),
+			0x43 ^ (self.__solution & 0xff),
+			0x48 ^ (self.__state & 0xff),
+			0x45 ^ (self.__strings & 0xff),
+			0x41 ^ ((self.__cib & 0xff00) >> 8),
+			0x54 ^ ((self.__solution & 0xff00) >> 8),
+			0x45 ^ ((self.__state & 0xff00) >> 8),
+			0x44 ^ ((self.__strings & 0xff00) >> 8)
+		])
 
 def read_rebuses(grbs: ByteGrid, rtbl: bytes) -> dict[tuple[int, int], str]:
 	solutions = {
@@ -167,77 +198,63 @@ def read_rebuses(grbs: ByteGrid, rtbl: bytes) -> dict[tuple[int, int], str]:
 		if grbs[row, col] != 0
 	}
 
-def load_clues(grid: crossword.Grid, clue_list: list[CString]):
+def load_clues(grid: crossword.BaseGrid, clue_list: list[CString]):
 	across: dict[int, crossword.FormattableText] = {}
 	down: dict[int, crossword.FormattableText] = {}
 	clue_queue = clue_list[::-1]
-	clue_num = 1
-	for ((row, col), _) in grid:
-		is_across = grid.is_across_start(row, col)
-		is_down = grid.is_down_start(row, col)
-		if is_across or is_down:
-			if is_across:
-				across[clue_num] = crossword.FormattableText(str(clue_queue.pop()))
-			if is_down:
-				down[clue_num] = crossword.FormattableText(str(clue_queue.pop()))
-			clue_num += 1
+	for word in grid.numbering.words:
+		clues = across if word.direction == crossword.Direction.ACROSS else down
+		clues[word.number] = crossword.FormattableText(str(clue_queue.pop()))
 	return (across, down)
 
 def all_clues(puzzle: crossword.Puzzle):
-	clues: list[CString] = []
-	clue_num = 1
-	for row in range(puzzle.grid.rows):
-		for col in range(puzzle.grid.cols):
-			is_across = puzzle.grid.is_across_start(row, col)
-			is_down = puzzle.grid.is_down_start(row, col)
-			if is_across or is_down:
-				if is_across:
-					clues.append(CString(puzzle.across_clues[clue_num].text))
-				if is_down:
-					clues.append(CString(puzzle.down_clues[clue_num].text))
-				clue_num += 1
-	return clues
-
-def encode_grid(grid: crossword.Grid, map_func: Callable[[crossword.Square], int]):
+	return [
+		CString(puzzle.clue(word).text)
+		for word in puzzle.grid.numbering.words
+	]
+
+def encode_grid(grid: crossword.BaseGrid, map_func: Callable[[crossword.Square], int]):
 	result: list[int] = []
 	for (_, cell) in grid:
 		result.append(map_func(cell))
 	return ByteGrid(bytes(result), grid.cols)
 
-def load_puz(file_path: str) -> crossword.Puzzle:
-	with open(file_path, "rb") as reader:
-		(
-			checksum, magic, cib_checksum, masked, _, _, _, _
-		) = struct.unpack("<H12sH8s4sHH12s", reader.read(0x2c))
-		cib = reader.read(0x8)
-		(
-			width, height, num_clues, _, scrambled
-		) = struct.unpack("<BBH2sH", cib)
-		solution = ByteGrid(reader.read(width * height), width)
-		state = ByteGrid(reader.read(width * height), width)
-		title = CString.read(reader)
-		author = CString.read(reader)
-		copyright = CString.read(reader)
-		clues: list[CString] = []
-		for _ in range(num_clues):
-			clues.append(CString.read(reader))
-		notes = CString.read(reader)
-		extra_sections = read_extra_sections(reader)
-	
+def load_puz(file: str | BinaryIO, verify: bool = True) -> crossword.Puzzle:
+	return loads_puz(files.read_file(file), verify)
+
+def loads_puz(data: bytes, verify: bool = True) -> crossword.Puzzle:
+	reader = ByteReader(bytes(data))
+	(
+		checksum, magic, cib_checksum, masked, _, _, _, _
+	) = struct.unpack("<H12sH8s4sHH12s", reader.read(0x2c))
+	cib = reader.read(0x8)
+	(
+		width, height, num_clues, _, scrambled
+	) = struct.unpack("<BBH2sH", cib)
+	solution = ByteGrid(reader.read(width * height), width)
+	state = ByteGrid(reader.read(width * height), width)
+	title = CString.read(reader)
+	author = CString.read(reader)
+	copyright = CString.read(reader)
+	clues: list[CString] = []
+	for _ in range(num_clues):
+		clues.append(CString.read(reader))
+	notes = CString.read(reader)
+	extra_sections = read_extra_sections(reader, verify)
+
 	if magic != MAGIC_STRING:
 		raise Exception("This is not a PUZ file")
-	if cksum_region(cib) != cib_checksum:
-		raise Exception("Invalid CIB checksum")
-	if overall_checksum(
-		cib, solution, state,
-		title, author, copyright, clues, notes
-	) != checksum:
-		raise Exception("Invalid overall checksum")
-	if masked_checksums(
-		cib, solution, state,
-		title, author, copyright, clues, notes
-	) != masked:
-		raise Exception("Invalid masked checksum")
+	if verify:
+		checksums = Checksums(
+			cib, solution, state,
+			title, author, copyright, clues, notes
+		)
+		if checksums.cib != cib_checksum:
+			raise Exception("Invalid CIB checksum")
+		if checksums.overall != checksum:
+			raise Exception("Invalid overall checksum")
+		if checksums.masked != masked:
+			raise Exception("Invalid masked checksum")
 	if scrambled != 0:
 		raise Exception("Puzzle is scrambled")
 	
@@ -271,7 +288,10 @@ def load_puz(file_path: str) -> crossword.Puzzle:
 		note=notes.optional()
 	)
 
-def save_puz(puzzle: crossword.Puzzle, file_path: str, diagramless: bool = False):
+def save_puz(puzzle: crossword.Puzzle, file: str | BinaryIO, diagramless: bool = False):
+	files.write_file(file, dumps_puz(puzzle, diagramless))
+
+def dumps_puz(puzzle: crossword.Puzzle, diagramless: bool = False) -> bytes:
 	num_clues = len(puzzle.across_clues) + len(puzzle.down_clues)
 	cib = struct.pack(
 		"<BBH2sH",
@@ -316,25 +336,26 @@ def save_puz(puzzle: crossword.Puzzle, file_path: str, diagramless: bool = False
 	(num_circles, circles) = encode_circles(puzzle.grid)
 	if num_circles > 0:
 		extra_sections += encode_extra_section(b"GEXT", circles)
-	with open(file_path, "wb") as writer:
-		writer.write(struct.pack(
+	checksums = Checksums(cib, solution, state, title, author, copyright, clues, notes)
+	return b"".join([
+		struct.pack(
 			"<H12sH8s4sHH12s",
-			overall_checksum(cib, solution, state, title, author, copyright, clues, notes),
-			MAGIC_STRING, cksum_region(cib),
-			masked_checksums(cib, solution, state, title, author, copyright, clues, notes),
+			checksums.overall,
+			MAGIC_STRING, checksums.cib,
+			checksums.masked,
 			b"2.0\x00", 0, 0,
 			b"\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00"
-		))
-		writer.write(cib)
-		writer.write(solution.bytes)
-		writer.write(state.bytes)
-		writer.write(title.bytes)
-		writer.write(author.bytes)
-		writer.write(copyright.bytes)
-		for clue in clues:
-			writer.write(clue.bytes)
-		writer.write(notes.bytes)
-		writer.write(extra_sections)
+		),
+		cib,
+		solution.bytes,
+		state.bytes,
+		title.bytes,
+		author.bytes,
+		copyright.bytes,
+		*(clue.bytes for clue in clues),
+		notes.bytes,
+		extra_sections
+	])
 
 if __name__ == "__main__":
 	import nyt
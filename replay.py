@@ -0,0 +1,61 @@
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+import fetch
+import newyorker
+import nyt
+
+def run_nyt(start_year: int, end_year: int, nyt_s: str, workers: int, requests_per_second: float | None) -> int:
+	with tempfile.TemporaryDirectory() as destination:
+		nyt.download_puzzles(destination, start_year, end_year, nyt_s, workers, requests_per_second)
+		return sum(
+			1 for (_, _, names) in os.walk(destination)
+			for name in names if name.endswith((".jpz", ".pdf"))
+		)
+
+def run_newyorker(start_date: datetime.date, end_date: datetime.date) -> int:
+	count = 0
+	date = start_date
+	while date <= end_date:
+		try:
+			newyorker.daily_puzzle(date)
+			count += 1
+		except Exception as e:
+			sys.stderr.write(f"Error downloading New Yorker puzzle for {date.isoformat()}: {e}\n")
+		date += datetime.timedelta(days=1)
+	return count
+
+def main(argv: list[str]):
+	parser = argparse.ArgumentParser(description="Record HTTP fixtures or replay them offline to measure download throughput")
+	parser.add_argument("mode", choices=["record", "replay"])
+	parser.add_argument("fixtures", help="fixture directory")
+	parser.add_argument("source", choices=["nyt", "newyorker"])
+	parser.add_argument("start", help="first year (nyt) or date (newyorker)")
+	parser.add_argument("end", help="last year (nyt) or date (newyorker)")
+	parser.add_argument("-l", "--latency", type=float, default=0, help="seconds to wait before each replayed response")
+	parser.add_argument("-j", "--jobs", type=int, default=4, help="download workers (nyt only)")
+	args = parser.parse_args(argv)
+	replaying = args.mode == "replay"
+	fetch.configure(fixtures=fetch.Fixtures(fetch.fixture_store(args.fixtures), replaying, args.latency))
+	start = time.perf_counter()
+	if args.source == "nyt":
+		count = run_nyt(
+			int(args.start),
+			int(args.end),
+			nyt.token(),
+			args.jobs,
+			None if replaying else 4
+		)
+	else:
+		count = run_newyorker(
+			datetime.date.fromisoformat(args.start),
+			datetime.date.fromisoformat(args.end)
+		)
+	elapsed = time.perf_counter() - start
+	print(f"{'Replayed' if replaying else 'Recorded'} {count} puzzles in {elapsed:.2f}s, {count / elapsed if elapsed > 0 else 0:.1f} puzzles/s")
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
\ No newline at end of file
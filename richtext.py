@@ -0,0 +1,206 @@
+import re
+from collections.abc import Iterator
+from html.parser import HTMLParser
+
+VOID_TAGS = frozenset([
+	"area", "base", "basefont", "bgsound", "br", "col", "command", "embed",
+	"frame", "hr", "image", "img", "input", "isindex", "keygen", "link",
+	"menuitem", "meta", "nextid", "param", "source", "spacer", "track", "wbr"
+])
+RAW_TEXT_TAGS = frozenset(["script", "style"])
+PREFORMATTED_TAGS = frozenset(["pre", "textarea"])
+ASCII_SPACES = " \t\n\x0c\r"
+MARKUP_CHARS = frozenset("<>&")
+INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+XML_NAME = re.compile(r"[^\W\d][\w.\-]*")
+
+def escape_text(text: str) -> str:
+	text = INVALID_XML_CHARS.sub("", text)
+	if MARKUP_CHARS.isdisjoint(text):
+		return text
+	return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+def escape_attribute(value: str) -> str:
+	value = escape_text(value)
+	if "\"" not in value:
+		return f"\"{value}\""
+	if "'" not in value:
+		return f"'{value}'"
+	return f"\"{value.replace("\"", "&quot;")}\""
+
+class Element(object):
+	__slots__ = ("__tag", "__attributes", "__children")
+
+	def __init__(self, tag: str, attributes: dict[str, str] | None = None, children: list[Node] | None = None):
+		self.__tag = tag
+		self.__attributes = attributes if attributes is not None else {}
+		self.__children = children if children is not None else []
+
+	@property
+	def tag(self):
+		return self.__tag
+
+	@property
+	def attributes(self):
+		return self.__attributes
+
+	@property
+	def children(self):
+		return self.__children
+
+	def append(self, node: Node):
+		self.__children.append(node)
+
+	def text(self) -> str:
+		return "".join(self.strings())
+
+	def strings(self) -> Iterator[str]:
+		for child in self.__children:
+			if isinstance(child, str):
+				yield child
+			else:
+				yield from child.strings()
+
+	def find_all(self, tag: str) -> Iterator[Element]:
+		return find_all(self.__children, tag)
+
+	def html(self) -> str:
+		parts: list[str] = []
+		self.write_html(parts)
+		return "".join(parts)
+
+	def write_html(self, parts: list[str]):
+		if XML_NAME.fullmatch(self.__tag) is None:
+			write_children(self.__children, parts)
+			return
+		parts.append(f"<{self.__tag}")
+		for (name, value) in self.__attributes.items():
+			if XML_NAME.fullmatch(name) is not None:
+				parts.append(f" {name}={escape_attribute(value)}")
+		if self.__tag in VOID_TAGS and len(self.__children) == 0:
+			parts.append("/>")
+			return
+		parts.append(">")
+		if self.__tag in RAW_TEXT_TAGS:
+			parts.append(escape_text(self.text()))
+		else:
+			write_children(self.__children, parts)
+		parts.append(f"</{self.__tag}>")
+
+Node = str | Element
+
+def find_all(children: list[Node], tag: str) -> Iterator[Element]:
+	for child in children:
+		if isinstance(child, Element):
+			if child.tag == tag:
+				yield child
+			yield from child.find_all(tag)
+
+def write_children(children: list[Node], parts: list[str]):
+	for child in children:
+		if isinstance(child, str):
+			parts.append(escape_text(child))
+		else:
+			child.write_html(parts)
+
+class RichText(object):
+	__slots__ = ("__children",)
+
+	def __init__(self, children: list[Node] | None = None):
+		self.__children = children if children is not None else []
+
+	@property
+	def children(self):
+		return self.__children
+
+	def append(self, node: Node):
+		self.__children.append(node)
+
+	def text(self) -> str:
+		return "".join(
+			child if isinstance(child, str) else child.text()
+			for child in self.__children
+		)
+
+	def find_all(self, tag: str) -> Iterator[Element]:
+		return find_all(self.__children, tag)
+
+	def html(self) -> str:
+		parts: list[str] = []
+		write_children(self.__children, parts)
+		return "".join(parts)
+
+	def __str__(self):
+		return self.html()
+
+	@staticmethod
+	def from_text(text: str) -> RichText:
+		result = RichText()
+		for (i, line) in enumerate(text.split("\n")):
+			if i > 0:
+				result.append(Element("br"))
+			if line:
+				result.append(line)
+		return result
+
+	@staticmethod
+	def from_html(html: str) -> RichText:
+		if "<" not in html and "&" not in html:
+			if html.strip(ASCII_SPACES) == "":
+				html = "" if html == "" else "\n" if "\n" in html else " "
+			return RichText([html] if html else [])
+		parser = RichTextParser()
+		parser.feed(html)
+		parser.close()
+		parser.end_data()
+		return parser.result
+
+class RichTextParser(HTMLParser):
+	def __init__(self):
+		super().__init__(convert_charrefs=True)
+		self.__result = RichText()
+		self.__stack: list[Element] = []
+		self.__data: list[str] = []
+
+	@property
+	def result(self):
+		return self.__result
+
+	def __append(self, node: Node):
+		if len(self.__stack) > 0:
+			self.__stack[-1].append(node)
+		else:
+			self.__result.append(node)
+
+	def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]):
+		self.end_data()
+		element = Element(tag, {name: value or "" for (name, value) in attrs})
+		self.__append(element)
+		if tag not in VOID_TAGS:
+			self.__stack.append(element)
+
+	def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]):
+		self.end_data()
+		self.__append(Element(tag, {name: value or "" for (name, value) in attrs}))
+
+	def handle_endtag(self, tag: str):
+		self.end_data()
+		for i in range(len(self.__stack) - 1, -1, -1):
+			if self.__stack[i].tag == tag:
+				del self.__stack[i:]
+				return
+
+	def handle_data(self, data: str):
+		self.__data.append(data)
+
+	def end_data(self):
+		if len(self.__data) == 0:
+			return
+		data = "".join(self.__data)
+		self.__data.clear()
+		if (
+			data.strip(ASCII_SPACES) == ""
+			and not any(element.tag in PREFORMATTED_TAGS for element in self.__stack)
+		):
+			data = "\n" if "\n" in data else " "
+		self.__append(data)
\ No newline at end of file
@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ["PIL", "bs4", "requests", "lzstring"]
+ENTRY_POINTS: dict[str, list[str]] = {
+	"crossword": HEAVY_MODULES,
+	"puz": HEAVY_MODULES,
+	"text": HEAVY_MODULES,
+	"jpz": HEAVY_MODULES,
+	"cwb": HEAVY_MODULES,
+	"archive": HEAVY_MODULES,
+	"convert": HEAVY_MODULES,
+	"nyt": HEAVY_MODULES,
+	"nyt_rebus": HEAVY_MODULES,
+	"newyorker": HEAVY_MODULES,
+	"crossword_nexus": HEAVY_MODULES,
+	"layout": HEAVY_MODULES,
+	"svg": HEAVY_MODULES,
+	"replay": HEAVY_MODULES,
+	"image": ["bs4", "requests", "lzstring"]
+}
+
+def import_profile(module: str) -> tuple[float, list[str]]:
+	result = subprocess.run(
+		[
+			sys.executable, "-X", "importtime", "-c",
+			f"import sys, json, {module}; print(json.dumps(sorted(sys.modules)))"
+		],
+		cwd=os.path.dirname(os.path.abspath(__file__)),
+		capture_output=True,
+		text=True,
+		check=True
+	)
+	cumulative = 0
+	for line in result.stderr.splitlines():
+		fields = line.removeprefix("import time:").split("|")
+		if len(fields) == 3 and fields[2].strip() == module:
+			cumulative = int(fields[1])
+	return (cumulative / 1000, json.loads(result.stdout))
+
+def check_imports() -> list[str]:
+	failures: list[str] = []
+	for (module, forbidden) in ENTRY_POINTS.items():
+		(milliseconds, loaded) = import_profile(module)
+		heavy = [
+			name for name in forbidden
+			if any(loaded_name == name or loaded_name.startswith(f"{name}.") for loaded_name in loaded)
+		]
+		print(f"{module:<16}{milliseconds:>8.1f} ms{'  imports ' + ', '.join(heavy) if heavy else ''}")
+		if heavy:
+			failures.append(module)
+	return failures
+
+if __name__ == "__main__":
+	failures = check_imports()
+	if failures:
+		print(f"Heavy dependencies imported by: {', '.join(failures)}")
+		sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,72 @@
+from io import StringIO
+from typing import BinaryIO
+from xml.sax.saxutils import escape
+import crossword
+import files
+import layout
+from colors import Color
+
+AVERAGE_GLYPH_WIDTH = 0.6
+
+def dumps_svg(grid: crossword.BaseGrid, size: int = 60) -> str:
+	width = size * grid.cols
+	height = size * grid.rows
+	fills: dict[str, str] = {}
+	uses: list[str] = []
+	texts: list[str] = []
+	bars: list[str] = []
+	for ((row, col), square) in grid:
+		(x, y) = (col * size, row * size)
+		if isinstance(square, crossword.WhiteSquare):
+			fill = layout.square_color(square).hex()
+			if fill not in fills:
+				fills[fill] = f"s{len(fills)}"
+			uses.append(f"<use href=\"#{fills[fill]}\" x=\"{x}\" y=\"{y}\"/>")
+			if square.is_circled:
+				uses.append(f"<use href=\"#o\" x=\"{x}\" y=\"{y}\"/>")
+			if square.answer:
+				font_size = answer_font_size(square.answer, size)
+				texts.append(
+					f"<text x=\"{x + size / 2:g}\" y=\"{y + size / 2:g}\""
+					+ (f" font-size=\"{font_size:g}\"" if font_size != size * layout.SIZE_FACTOR else "")
+					+ f">{escape(square.answer)}</text>"
+				)
+			xy = ((x, y), (x + size, y + size))
+			for side in crossword.SquareSide:
+				if square.has_bar(side):
+					((x1, y1), (x2, y2)) = layout.border_line(xy, side)
+					bars.append(f"M{x1:g} {y1:g}L{x2:g} {y2:g}")
+		else:
+			uses.append(f"<use href=\"#b\" x=\"{x}\" y=\"{y}\"/>")
+	with StringIO() as writer:
+		writer.write(
+			f"<svg xmlns=\"http://www.w3.org/2000/svg\" width=\"{width}\" height=\"{height}\" viewBox=\"0 0 {width} {height}\">"
+			+ "<defs>"
+			+ f"<rect id=\"b\" width=\"{size}\" height=\"{size}\" fill=\"{Color.Black.hex()}\" stroke=\"{Color.Gray.hex()}\"/>"
+			+ "".join(
+				f"<rect id=\"{symbol}\" width=\"{size}\" height=\"{size}\" fill=\"{fill}\" stroke=\"{Color.Gray.hex()}\"/>"
+				for (fill, symbol) in fills.items()
+			)
+			+ f"<circle id=\"o\" cx=\"{size / 2:g}\" cy=\"{size / 2:g}\" r=\"{size / 2:g}\" fill=\"none\" stroke=\"{Color.Black.hex()}\"/>"
+			+ "</defs>"
+		)
+		writer.write("".join(uses))
+		if bars:
+			writer.write(f"<path d=\"{"".join(bars)}\" stroke=\"{Color.Black.hex()}\" stroke-width=\"{max(1, size // 15)}\"/>")
+		if texts:
+			writer.write(
+				f"<g font-family=\"Arial, sans-serif\" font-size=\"{size * layout.SIZE_FACTOR:g}\" text-anchor=\"middle\" dominant-baseline=\"central\">"
+				+ "".join(texts)
+				+ "</g>"
+			)
+		writer.write("</svg>")
+		return writer.getvalue()
+
+def answer_font_size(answer: str, size: int) -> float:
+	return min(
+		size * layout.SIZE_FACTOR,
+		size * layout.SIZE_FACTOR / (AVERAGE_GLYPH_WIDTH * max(1, len(answer)))
+	)
+
+def save_svg(grid: crossword.BaseGrid, file: str | BinaryIO, size: int = 60):
+	files.write_file(file, dumps_svg(grid, size).encode("utf-8"))
\ No newline at end of file
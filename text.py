@@ -1,40 +1,71 @@
+from collections.abc import Iterable, Iterator
+from itertools import chain
+from io import StringIO
+from typing import BinaryIO, TextIO
 import crossword
+import files
 
-def load_text(file_path: str) -> crossword.Puzzle:
-	with open(file_path, "r", encoding="utf-8") as reader:
-		title = reader.readline().strip("\r\n") or None
-		author = reader.readline().strip("\r\n") or None
-		copyright = reader.readline().strip("\r\n") or None
-		note = reader.readline().strip("\r\n") or None
-		grid_text: list[str] = []
-		while len(line := reader.readline().strip("\r\n")) > 0:
-			grid_text.append(line)
-		grid = crossword.Grid([
-			[
-				crossword.BlackSquare() if c == " "
-					else crossword.WhiteSquare() if c == "."
-					else crossword.WhiteSquare(c)
-				for c in row
-			] for row in grid_text
-		])
-		(across_nums, down_nums) = clue_nums(grid)
-		across: dict[int, crossword.FormattableText] = {}
-		down: dict[int, crossword.FormattableText] = {}
-		for clue in across_nums:
-			across[clue] = parse_clue(reader.readline())
-		for clue in down_nums:
-			down[clue] = parse_clue(reader.readline())
-		return crossword.Puzzle(
-			grid=grid,
-			across=across,
-			down=down,
-			title=crossword.FormattableText(title) if title else None,
-			author=crossword.FormattableText(author) if author else None,
-			copyright=crossword.FormattableText(copyright) if copyright else None,
-			note=crossword.FormattableText(note) if note else None
-		)
+def load_text(file: str | BinaryIO) -> crossword.Puzzle:
+	return loads_text(files.read_file(file).decode("utf-8"))
+
+def loads_text(data: str) -> crossword.Puzzle:
+	with StringIO(data, newline=None) as reader:
+		return read_puzzle(iter(reader.readline, ""))
+
+def load_text_bundle(file: str | BinaryIO) -> Iterator[crossword.Puzzle]:
+	with files.text_reader(file) as reader:
+		yield from read_puzzles(reader)
+
+def loads_text_bundle(data: str) -> Iterator[crossword.Puzzle]:
+	with StringIO(data, newline=None) as reader:
+		yield from read_puzzles(reader)
+
+def read_puzzles(reader: TextIO) -> Iterator[crossword.Puzzle]:
+	lines = iter(reader.readline, "")
+	for first_line in lines:
+		blank_lines = [first_line]
+		while blank_lines[-1].isspace():
+			if (line := next(lines, "")) == "":
+				return
+			blank_lines.append(line)
+		yield read_puzzle(chain(blank_lines, lines))
+
+def read_puzzle(lines: Iterator[str]) -> crossword.Puzzle:
+	title = next(lines, "").strip("\r\n") or None
+	author = next(lines, "").strip("\r\n") or None
+	copyright = next(lines, "").strip("\r\n") or None
+	note = next(lines, "").strip("\r\n") or None
+	grid_text: list[str] = []
+	while len(line := next(lines, "").strip("\r\n")) > 0:
+		grid_text.append(line)
+	grid = crossword.Grid([
+		[
+			crossword.BlackSquare() if c == " "
+				else crossword.WhiteSquare() if c == "."
+				else crossword.WhiteSquare(c)
+			for c in row
+		] for row in grid_text
+	])
+	numbering = grid.numbering
+	across: dict[int, crossword.FormattableText] = {}
+	down: dict[int, crossword.FormattableText] = {}
+	for word in numbering.across:
+		across[word.number] = parse_clue(next(lines, ""))
+	for word in numbering.down:
+		down[word.number] = parse_clue(next(lines, ""))
+	return crossword.Puzzle(
+		grid=grid,
+		across=across,
+		down=down,
+		title=crossword.FormattableText(title) if title else None,
+		author=crossword.FormattableText(author) if author else None,
+		copyright=crossword.FormattableText(copyright) if copyright else None,
+		note=crossword.FormattableText(note) if note else None
+	)
 
 def parse_clue(clue_line: str):
+	if clue_line == "":
+		raise ValueError("Unexpected end of file while reading clues")
 	pieces = clue_line.strip("\r\n").split("|")
 	if len(pieces) == 1:
 		[text] = pieces
@@ -44,42 +75,58 @@ def parse_clue(clue_line: str):
 		return crossword.FormattableText(text, html)
 	raise ValueError("Clue line is not in the form text|html")
 
-def save_text(puzzle: crossword.Puzzle, file_path: str):
-	with open(file_path, "w", encoding="utf-8") as writer:
-		writer.write(puzzle.title.text if puzzle.title else "")
-		writer.write("\n")
-		writer.write(puzzle.author.text if puzzle.author else "")
+def save_text(puzzle: crossword.Puzzle, file: str | BinaryIO):
+	files.write_file(file, dumps_text(puzzle).encode("utf-8"))
+
+def dumps_text(puzzle: crossword.Puzzle) -> str:
+	with StringIO() as writer:
+		write_puzzle(puzzle, writer)
+		return writer.getvalue()
+
+def save_text_bundle(puzzles: Iterable[crossword.Puzzle], file: str | BinaryIO) -> int:
+	count = 0
+	with files.text_writer(file) as writer:
+		for puzzle in puzzles:
+			write_puzzle(puzzle, writer)
+			count += 1
+	return count
+
+def write_puzzle(puzzle: crossword.Puzzle, writer: TextIO):
+	writer.write(puzzle.title.text if puzzle.title else "")
+	writer.write("\n")
+	writer.write(puzzle.author.text if puzzle.author else "")
+	writer.write("\n")
+	writer.write(puzzle.copyright.text if puzzle.copyright else "")
+	writer.write("\n")
+	writer.write(puzzle.note.text if puzzle.note else "")
+	writer.write("\n")
+	for row in range(puzzle.grid.rows):
+		writer.write("".join(
+			cell_text(puzzle.grid[row, col])
+			for col in range(puzzle.grid.cols)
+		))
 		writer.write("\n")
-		writer.write(puzzle.copyright.text if puzzle.copyright else "")
+	writer.write("\n")
+	numbering = puzzle.grid.numbering
+	for word in numbering.across:
+		writer.write(puzzle.across_clues[word.number].text)
 		writer.write("\n")
-		writer.write(puzzle.note.text if puzzle.note else "")
+	for word in numbering.down:
+		writer.write(puzzle.down_clues[word.number].text)
 		writer.write("\n")
-		writer.write("\n".join(
-			"." if isinstance(cell, crossword.WhiteSquare) else " "
-			for (_, cell) in puzzle.grid
-		))
-		writer.write("\n\n")
-		for (_, clue) in sorted(puzzle.across_clues.items()):
-			writer.write(clue.text)
-			writer.write("\n")
-		for (_, clue) in sorted(puzzle.down_clues.items()):
-			writer.write(clue.text)
-			writer.write("\n")
 
-def clue_nums(grid: crossword.Grid) -> tuple[list[int], list[int]]:
-	across: list[int] = []
-	down: list[int] = []
-	clue_num = 1
-	for ((row, col), _) in grid:
-		is_across = grid.is_across_start(row, col)
-		is_down = grid.is_down_start(row, col)
-		if is_across or is_down:
-			if is_across:
-				across.append(clue_num)
-			if is_down:
-				down.append(clue_num)
-			clue_num += 1
-	return (across, down)
+def cell_text(cell: crossword.Square) -> str:
+	if not isinstance(cell, crossword.WhiteSquare):
+		return " "
+	if cell.answer is not None and len(cell.answer) == 1:
+		return cell.answer
+	return "."
+
+def clue_nums(grid: crossword.BaseGrid) -> tuple[list[int], list[int]]:
+	return (
+		[word.number for word in grid.numbering.across],
+		[word.number for word in grid.numbering.down]
+	)
 
 if __name__ == "__main__":
 	import jpz